@@ -49,24 +49,108 @@
 # ------------------------------------------------------------------------------
 
 import math
+import bisect
+import collections
+import itertools
 import numpy as np
 
-def medfilt (x, k):
+def medfilt (x, k, chunkSize=65536):
     """Apply a length-k median filter to a 1D array x.
     Boundaries are extended by repeating endpoints.
+    The windows are taken chunkSize samples at a time, so besides the
+    output the working memory is about chunkSize x k values.
     """
     assert k % 2 == 1, "Median filter length must be odd."
+    x = np.asarray(x)
     assert x.ndim == 1, "Input must be one-dimensional."
+    n = len(x)
+    y = np.empty(n, dtype=np.float64)
+    if n == 0:
+        return y
     k2 = (k - 1) // 2
-    y = np.zeros ((len (x), k), dtype=x.dtype)
-    y[:,k2] = x
-    for i in range (k2):
-        j = k2 - i
-        y[j:,i] = x[:-j]
-        y[:j,i] = x[0]
-        y[:-j,-(i+1)] = x[j:]
-        y[-j:,-(i+1)] = x[-1]
-    return np.median (y, axis=1)
+    for start in range(0, n, chunkSize):
+        end = min(start + chunkSize, n)
+        # the samples the windows of this chunk cover, padded at the ends of x
+        lo = start - k2
+        hi = end + k2
+        segment = np.concatenate((np.repeat(x[:1], max(0, -lo)),
+                                  x[max(lo, 0):min(hi, n)],
+                                  np.repeat(x[-1:], max(0, hi - n))))
+        y[start:end] = np.median(np.lib.stride_tricks.sliding_window_view(segment, k), axis=1)
+    return y
+
+def runningMedian (x, k):
+    """Apply a length-k median filter to a 1D array x with a RunningMedian
+    window, in O(n log k) time. Gives the same result as medfilt, but
+    works one sample at a time.
+    """
+    assert k % 2 == 1, "Median filter length must be odd."
+    x = np.asarray(x)
+    assert x.ndim == 1, "Input must be one-dimensional."
+    y = np.empty(len(x), dtype=np.float64)
+    if len(x) == 0:
+        return y
+    k2 = (k - 1) // 2
+    window = RunningMedian(k)
+    padded = itertools.chain(itertools.repeat(float(x[0]), k2), (float(v) for v in x),
+                             itertools.repeat(float(x[-1]), k2))
+    # prime the window with all but the last sample of the first window
+    for v in itertools.islice(padded, k - 1):
+        window.push(v)
+    for i, v in enumerate(padded):
+        y[i] = window.push(v)
+    return y
+
+class RunningMedian:
+    """Median of a sliding window over the most recent k samples of a stream.
+    The window is kept sorted, so push and pop locate their sample with a
+    binary search and memory is O(k) however long the stream runs.
+    Use push() to add samples, pop() to retire the oldest early and median()
+    to read the current value.
+    NaN samples are counted rather than sorted, and the median of a window
+    holding one is NaN, as with np.median.
+    """
+    def __init__ (self, k):
+        assert k > 0, "Window length must be positive."
+        self.k = k
+        self.samples = collections.deque()
+        self.ordered = []
+        self.nans = 0
+
+    def __len__ (self):
+        return len(self.samples)
+
+    def push (self, value):
+        """Add a sample, retiring the oldest once the window holds k samples.
+        Returns the median of the window."""
+        if len(self.samples) == self.k:
+            self.pop()
+        self.samples.append(value)
+        if value != value:
+            self.nans += 1
+        else:
+            bisect.insort(self.ordered, value)
+        return self.median()
+
+    def pop (self):
+        """Remove and return the oldest sample in the window."""
+        value = self.samples.popleft()
+        if value != value:
+            self.nans -= 1
+        else:
+            del self.ordered[bisect.bisect_left(self.ordered, value)]
+        return value
+
+    def median (self):
+        """Median of the samples currently in the window, or None if it is empty."""
+        if self.nans:
+            return float('nan')
+        n = len(self.ordered)
+        if n == 0:
+            return None
+        if n % 2:
+            return self.ordered[n // 2]
+        return (self.ordered[n // 2 - 1] + self.ordered[n // 2]) / 2.0
     
 # from: http://mathforum.org/library/drmath/view/62034.html
 def calculateRangeBearingFromGridPosition(easting1, northing1, easting2, northing2):
@@ -199,6 +283,131 @@ def calculateRangeBearingFromGeographicals(longitude1, latitude1,  longitude2,
 
    # END of Vincenty's Inverse formulae 
 
+def calculateRangeBearingFromGridPositionArray(easting1, northing1, easting2, northing2):
+    """array version of calculateRangeBearingFromGridPosition. Takes numpy arrays of east, north pairs and returns (range, bearing) arrays"""
+    easting1, northing1, easting2, northing2 = [np.asarray(v, dtype=np.float64) for v in (easting1, northing1, easting2, northing2)]
+    dx = easting2-easting1
+    dy = northing2-northing1
+
+    bearing = 90 - (180/math.pi)*np.arctan2(dy, dx)
+    return (np.sqrt((dx*dx)+(dy*dy)), bearing)
+
+def calculateRangeBearingFromGeographicalsArray(longitude1, latitude1, longitude2, latitude2, maxIterations=200) :
+        """ 
+        Array version of calculateRangeBearingFromGeographicals.
+        Takes numpy arrays of lons and lats in decimal degrees. The Vincenty 
+        iterations run in lockstep across the whole array, and each element 
+        drops out of the loop as soon as its lembda has converged.
+        Nearly antipodal points which never converge stop after maxIterations.
+
+        Returns ( s, alpha1Tp2,  alpha21 ) as a tuple of arrays
+        """
+        f = 1.0 / 298.257223563		# WGS84
+        a = 6378137.0 			# metres
+        b = a * (1.0 - f)
+
+        longitude1, latitude1, longitude2, latitude2 = np.broadcast_arrays(*[np.asarray(v, dtype=np.float64) for v in (longitude1, latitude1, longitude2, latitude2)])
+        s = np.zeros(longitude1.shape)
+        alpha1Tp2 = np.zeros(longitude1.shape)
+        alpha21 = np.zeros(longitude1.shape)
+
+        # coincident points have zero range and bearing, exactly as the scalar version
+        valid = ~((np.abs(latitude2 - latitude1) < 1e-8) & (np.abs(longitude2 - longitude1) < 1e-8))
+        if not valid.any():
+                return s, alpha1Tp2, alpha21
+
+        piD4   = math.atan( 1.0 )
+        two_pi = piD4 * 8.0
+
+        lat1 = latitude1[valid] * piD4 / 45.0
+        lon1 = longitude1[valid] * piD4 / 45.0
+        lat2 = latitude2[valid] * piD4 / 45.0
+        lon2 = longitude2[valid] * piD4 / 45.0
+
+        U1 = np.arctan((1-f) * np.tan(lat1))
+        U2 = np.arctan((1-f) * np.tan(lat2))
+        sinU1, cosU1 = np.sin(U1), np.cos(U1)
+        sinU2, cosU2 = np.sin(U2), np.cos(U2)
+
+        omega = lon2 - lon1
+        lembda = omega.copy()
+
+        # the state from the last iteration of each element, needed once the loop is done
+        sqr_sin_sigma = np.zeros(omega.shape)
+        Sin_sigma = np.zeros(omega.shape)
+        Cos_sigma = np.zeros(omega.shape)
+        sigma = np.zeros(omega.shape)
+        cos_sq_alpha = np.zeros(omega.shape)
+        Cos2sigma_m = np.zeros(omega.shape)
+
+        # indices of the elements which are still iterating
+        active = np.arange(len(omega))
+        with np.errstate(divide='ignore', invalid='ignore'):
+                for iteration in range(maxIterations):
+                        if len(active) == 0:
+                                break
+                        l = lembda[active]
+                        sinU1a, cosU1a, sinU2a, cosU2a = sinU1[active], cosU1[active], sinU2[active], cosU2[active]
+
+                        sss = (cosU2a * np.sin(l))**2 + (cosU1a * sinU2a - sinU1a * cosU2a * np.cos(l))**2
+                        ss = np.sqrt(sss)
+                        cs = sinU1a * sinU2a + cosU1a * cosU2a * np.cos(l)
+                        sg = np.arctan2(ss, cs)
+
+                        Sin_alpha = cosU1a * cosU2a * np.sin(l) / np.sin(sg)
+                        csa = np.cos(np.arcsin(Sin_alpha))**2
+
+                        # equatorial lines have cos_sq_alpha of zero, where cos2sigma_m is defined as zero
+                        c2sm = np.where(csa != 0, np.cos(sg) - (2 * sinU1a * sinU2a / csa), 0.0)
+
+                        C = (f/16) * csa * (4 + f * (4 - 3 * csa))
+
+                        newLembda = omega[active] + (1-C) * f * Sin_alpha * (sg + C * np.sin(sg) * \
+                                (c2sm + C * np.cos(sg) * (-1 + 2 * c2sm**2)))
+
+                        sqr_sin_sigma[active] = sss
+                        Sin_sigma[active] = ss
+                        Cos_sigma[active] = cs
+                        sigma[active] = sg
+                        cos_sq_alpha[active] = csa
+                        Cos2sigma_m[active] = c2sm
+                        lembda[active] = newLembda
+
+                        converged = (newLembda == 0) | ~(np.abs((l - newLembda) / newLembda) > 1.0e-9)
+                        active = active[~converged]
+
+        u2 = cos_sq_alpha * (a*a-b*b) / (b*b)
+
+        A = 1 + (u2/16384) * (4096 + u2 * (-768 + u2 * (320 - 175 * u2)))
+
+        B = (u2/1024) * (256 + u2 * (-128+ u2 * (74 - 47 * u2)))
+
+        delta_sigma = B * Sin_sigma * (Cos2sigma_m + (B/4) * \
+                (Cos_sigma * (-1 + 2 * Cos2sigma_m**2 ) - \
+                (B/6) * Cos2sigma_m * (-3 + 4 * sqr_sin_sigma) * \
+                (-3 + 4 * Cos2sigma_m**2 )))
+
+        s[valid] = b * A * (sigma - delta_sigma)
+
+        a12 = np.arctan2( (cosU2 * np.sin(lembda)), \
+                (cosU1 * sinU2 - sinU1 * cosU2 * np.cos(lembda)))
+
+        a21 = np.arctan2( (cosU1 * np.sin(lembda)), \
+                (-sinU1 * cosU2 + cosU1 * sinU2 * np.cos(lembda)))
+
+        a12 = np.where(a12 < 0.0, a12 + two_pi, a12)
+        a12 = np.where(a12 > two_pi, a12 - two_pi, a12)
+
+        a21 = a21 + two_pi / 2.0
+        a21 = np.where(a21 < 0.0, a21 + two_pi, a21)
+        a21 = np.where(a21 > two_pi, a21 - two_pi, a21)
+
+        alpha1Tp2[valid] = a12 * 45.0 / piD4
+        alpha21[valid] = a21 * 45.0 / piD4
+        return s, alpha1Tp2, alpha21
+
+   # END of Vincenty's Inverse formulae, array version
+
 
 #-------------------------------------------------------------------------------
 # Vincenty's Direct formulae							|
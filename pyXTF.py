@@ -10,6 +10,8 @@
 
 import pprint
 import struct
+import array
+from mmap import mmap as MemoryMap, ACCESS_READ
 import os.path
 from datetime import datetime
 import geodetic
@@ -24,6 +26,10 @@ from argparse import RawTextHelpFormatter
 import os.path
 from glob import glob
 import fnmatch
+import hashlib
+import multiprocessing
+import threading
+import queue
 import shapefile
 
 def main():
@@ -35,6 +41,10 @@ def main():
 	parser.add_argument('-tl', action='store_true', default=True, dest='trackline', help='Create track polyline shapefile.')
 	parser.add_argument('-o', dest='outputFile', action='store', default='trackplot.shp', help='Output filename to create. e.g. coverage.shp [Default: trackplot.shp]')
 	parser.add_argument('-s', dest='step', action='store', default='10', help='Decimate the data to reduce the output size. [Default: 30]')
+	parser.add_argument('-j', '--jobs', dest='jobs', action='store', type=int, default=1, help='Number of files to process in parallel worker processes. [Default: 1]')
+	parser.add_argument('--sparse', action='store_true', default=False, dest='sparse', help='Build the track line by seeking to one ping every step seconds rather than reading the navigation of every ping. The navigation cache is not used. Fast for large files and long steps.')
+	parser.add_argument('-c', '--cache', dest='cacheDir', action='store', default=None, help='Cache the navigation of each file in this folder so reruns do not rescan unchanged files. [Default: no cache]')
+	parser.add_argument('--cachesize', dest='cacheSize', action='store', type=int, default=500, help='Maximum size of the navigation cache folder in MB. The least recently used files are evicted. [Default: 500]')
 
 	if len(sys.argv)==1:
 		parser.print_help()
@@ -72,97 +82,150 @@ def process(args):
 	trackLineFileName = os.path.join(os.path.dirname(os.path.abspath(args.outputFile)), fname + "_trackLine.shp")
 
 	if args.trackline:
+		appending = os.path.isfile(trackLineFileName)
 		TLshp = createSHP(trackLineFileName, shapefile.POLYLINE)
-		if len(TLshp.fields) <= 1:
+		if not appending:
 			TLshp.field("LineName", "C")
 			TLshp.field("SurveyDate", "D")
 
-	for filename in matches:
-		#open the XTF file for reading by creating a new XTFReader class and passin in the filename to open.  The reader will read the initial header so we can get to grips with the file contents with ease.  
-		print ( "processing file:", filename)
-		reader = XTFReader(filename)
-		start_time = time.time() # time  the process
+	navigationCache = None
+	if args.cacheDir is not None:
+		navigationCache = NavigationCache(args.cacheDir, args.cacheSize * 1024 * 1024)
 
-		# create the track polyline
-		if args.trackline:
-			createTrackLine(reader, TLshp, float(args.step))
+	if args.jobs > 1:
+		# the workers compute the tracklines in parallel.  imap returns them in the same order as matches, so this process is the only writer and the output is deterministic
+		pool = multiprocessing.Pool(args.jobs)
+		jobs = [(filename, float(args.step), args.cacheDir, args.cacheSize * 1024 * 1024, args.sparse) for filename in matches]
+		for filename, track, cacheStats in pool.imap(trackLineWorker, jobs):
+			print ( "processed file:", filename)
+			if navigationCache is not None:
+				# gather the statistics from the workers' caches
+				navigationCache.hits += cacheStats[0]
+				navigationCache.misses += cacheStats[1]
+				navigationCache.evictions += cacheStats[2]
+			if args.trackline and track is not None:
+				writeTrackLine(TLshp, filename, *track)
+		pool.close()
+		pool.join()
+	else:
+		for filename in matches:
+			#open the XTF file for reading by creating a new XTFReader class and passin in the filename to open.  The reader will read the initial header so we can get to grips with the file contents with ease.  
+			print ( "processing file:", filename)
+			reader = XTFReader(filename)
+			start_time = time.time() # time  the process
+
+			# create the track polyline
+			if args.trackline:
+				createTrackLine(reader, TLshp, float(args.step), navigationCache, args.sparse)
 		
-		# print the XTF file header information.  This gives a brief summary of the file contents.
-		# for ch in range(reader.XTFFileHdr.NumberOfSonarChannels):
-		# 	print(reader.XTFFileHdr.XTFChanInfo[ch])
-
-		# while reader.moreData():
-		# 	pingHdr = reader.readPacket()
-		# 	if pingHdr != -999:
-		# 		print (pingHdr.PingNumber,  pingHdr.SensorXcoordinate, pingHdr.SensorYcoordinate)
-
-		# reader.rewind()
-		# navigation = reader.loadNavigation()
-		# for n in navigation:
-		# 	print ("X: %.3f Y: %.3f Hdg: %.3f Alt: %.3f Depth: %.3f" % (n.sensorX, n.sensorY, n.sensorHeading, n.sensorAltitude, n.sensorDepth))
-		# print("Complete reading XTF file :-)")
-		reader.close()	
+			# print the XTF file header information.  This gives a brief summary of the file contents.
+			# for ch in range(reader.XTFFileHdr.NumberOfSonarChannels):
+			# 	print(reader.XTFFileHdr.XTFChanInfo[ch])
+
+			# while reader.moreData():
+			# 	pingHdr = reader.readPacket()
+			# 	if pingHdr != -999:
+			# 		print (pingHdr.PingNumber,  pingHdr.SensorXcoordinate, pingHdr.SensorYcoordinate)
+
+			# reader.rewind()
+			# navigation = reader.loadNavigation()
+			# for n in navigation:
+			# 	print ("X: %.3f Y: %.3f Hdg: %.3f Alt: %.3f Depth: %.3f" % (n.sensorX, n.sensorY, n.sensorHeading, n.sensorAltitude, n.sensorDepth))
+			# print("Complete reading XTF file :-)")
+			reader.close()	
 
 	update_progress("Process Complete: ", (fileCounter/len(matches)))
+	if navigationCache is not None:
+		print (navigationCache)
 	if args.trackline:
-		if len(TLshp.records) > 0:
+		# the records are already on disk, closing writes the headers
+		TLshp.close()
+		if TLshp.recNum > 0:
 			print ("Saving track line shapefile: %s" % trackLineFileName)		
-			TLshp.save(trackLineFileName)
 			# now write out a prj file so the data has a spatial Reference
 			prj = open(trackLineFileName.replace('.shp','.prj'), 'w')
 			prj.write('GEOGCS["GCS_WGS_1984",DATUM["D_WGS_1984",SPHEROID["WGS_1984",6378137.0,298.257223563]],PRIMEM["Greenwich",0.0],UNIT["Degree",0.0174532925199433]]') # python will convert \n to os.linesep
 			prj.close() # you can omit in most cases as the destructor will call it
 		else:
-			print ("Nothing to save to SHP, file skipping")		
+			print ("Nothing to save to SHP, file skipping")
+			if not appending:
+				for ext in ('.shp', '.shx', '.dbf'):
+					os.remove(trackLineFileName.replace('.shp', ext))		
 ###############################################################################
-def createTrackLine(reader, trackLine, step):
-	lastTimeStamp = 0
-	line_parts = []
-	line = []
-	navigation = reader.loadNavigation()
+def createTrackLine(reader, trackLine, step, navigationCache=None, sparse=False):
+	track = computeTrackLine(reader, step, navigationCache, sparse)
+	if track is None:
+		return
+	writeTrackLine(trackLine, reader.fileName, *track)
+
+def computeTrackLine(reader, step, navigationCache=None, sparse=False):
+	'''decimate the navigation to one fix every step seconds.  Returns (line, survey date) or None'''
+	if sparse:
+		navigation = reader.sampleNavigation(step)
+	elif navigationCache is None:
+		navigation = reader.loadNavigation()
+	else:
+		navigation = navigationCache.loadNavigation(reader)
 
 	if len(navigation) == 0:
-		return
+		return None
 
 	# create the trackline shape file
-	for update in navigation:
-		if update.timestamp - lastTimeStamp >= step:
-			line.append([float(update.sensorX),float(update.sensorY)])
-			lastTimeStamp = update.timestamp
-	# now add the very last update
-	line.append([float(navigation[-1].sensorX),float(navigation[-1].sensorY)])
-		
-	line_parts.append(line)
-	trackLine.line(parts=line_parts)
-	# now add to the shape file.
+	if sparse:
+		line = np.column_stack((navigation.sensorX, navigation.sensorY))
+	else:
+		line = decimateNavigation(navigation, step)
+		line = np.column_stack((navigation.sensorX[line], navigation.sensorY[line]))
 	recDate = from_timestamp(navigation[0].timestamp).strftime("%Y%m%d")
-	# write out the shape file FIELDS data
-	trackLine.record(os.path.basename(reader.fileName), recDate) 
+	return line, recDate
 
+def decimateNavigation(navigation, step):
+	'''return the indices of one fix every step seconds plus the very last fix'''
+	return decimateTimestamps(navigation.timestamp, step)
 
+def decimateTimestamps(timestamps, step):
+	'''return the indices of one timestamp every step seconds plus the very last one'''
+	lastTimeStamp = 0
+	line = []
+	for i, timestamp in enumerate(timestamps.tolist()):
+		if timestamp - lastTimeStamp >= step:
+			line.append(i)
+			lastTimeStamp = timestamp
+	# now add the very last update
+	line.append(len(timestamps) - 1)
+	return line
+
+def writeTrackLine(trackLine, fileName, line, recDate):
+	# the writer takes the array as it is and writes it in one block
+	trackLine.line(parts=[line])
+	# write out the shape file FIELDS data
+	trackLine.record(os.path.basename(fileName), recDate) 
+
+def trackLineWorker(job):
+	'''process pool worker.  Computes the trackline for one file'''
+	filename, step, cacheDir, cacheSize, sparse = job
+	navigationCache = None
+	if cacheDir is not None:
+		navigationCache = NavigationCache(cacheDir, cacheSize)
+	reader = XTFReader(filename)
+	track = computeTrackLine(reader, step, navigationCache, sparse)
+	reader.close()
+	cacheStats = (0, 0, 0)
+	if navigationCache is not None:
+		cacheStats = (navigationCache.hits, navigationCache.misses, navigationCache.evictions)
+	return filename, track, cacheStats
 
 ###############################################################################	
 def createSHP(fileName, geometrytype=shapefile.POLYLINE):
 	'''open for append or create the shape files. This can be a polyline <false> or polygon '''
 	if os.path.isfile(fileName):
 		try:
-			# Create a shapefile reader
-			r = shapefile.Reader(fileName)
-			# Create a shapefile writer
-			# using the same shape type
-			# as our reader
-			writer = shapefile.Writer(r.shapeType)
-			# Copy over the existing dbf fields
-			writer.fields = list(r.fields)
-			# Copy over the existing polygons
-			writer._shapes.extend(r.shapes())
-			# Copy over the existing dbf records
-			writer.records.extend(r.records())
-		except shapefile.error:
+			writer = shapefile.Writer(target=fileName, append=True)
+		except (shapefile.error, shapefile.ShapefileException):
 			print ("Problem opening existing shape file, aborting!")
 			exit()
 	else:
-		writer = shapefile.Writer(geometrytype)
+		writer = shapefile.Writer(geometrytype, target=fileName)
 		writer.autoBalance = 1
 	return writer
 
@@ -175,6 +238,13 @@ def to_timestamp(dateObject):
 def from_timestamp(unixtime):
 	return datetime.utcfromtimestamp(unixtime)
 
+def to_timestamps(year, month, day, hour, minute, second, hseconds):
+	'''vectorised version of to_timestamp() for numpy columns of XTF date and time fields'''
+	dates = (np.asarray(year, dtype=np.int64) - 1970).astype('datetime64[Y]').astype('datetime64[M]') + (np.asarray(month, dtype=np.int64) - 1)
+	dates = dates.astype('datetime64[D]') + (np.asarray(day, dtype=np.int64) - 1)
+	seconds = np.asarray(hour, dtype=np.float64) * 3600.0 + np.asarray(minute, dtype=np.float64) * 60.0 + np.asarray(second, dtype=np.float64) + np.asarray(hseconds, dtype=np.float64) / 100.0
+	return dates.astype(np.int64) * 86400.0 + seconds
+
 def dateToKongsbergDate(dateObject):
 	return dateObject.strftime('%Y%m%d')
 
@@ -206,13 +276,270 @@ class XTFNAVIGATIONRECORD:
 		self.sensorAltitude = sensorAltitude
 		self.sensorHeading = SensorHeading
 		self.sensorSpeed = sensorSpeed
-		   
+
+class NavigationArray:
+	'''navigation as numpy columns.  An integer index returns an XTFNAVIGATIONRECORD'''
+	def __init__(self, timestamp, pingNumber, sensorX, sensorY, sensorDepth, sensorAltitude, sensorHeading, sensorSpeed):
+		self.timestamp = np.asarray(timestamp, dtype=np.float64)
+		self.pingNumber = np.asarray(pingNumber, dtype=np.int64)
+		self.sensorX = np.asarray(sensorX, dtype=np.float64)
+		self.sensorY = np.asarray(sensorY, dtype=np.float64)
+		self.sensorDepth = np.asarray(sensorDepth, dtype=np.float64)
+		self.sensorAltitude = np.asarray(sensorAltitude, dtype=np.float64)
+		self.sensorHeading = np.asarray(sensorHeading, dtype=np.float64)
+		self.sensorSpeed = np.array(sensorSpeed, dtype=np.float64) # a copy, as computeSpeedFromPositions() updates it in place
+
+	@classmethod
+	def fromPingHeaders(cls, pingHeaders):
+		'''build from a structured array of ping headers'''
+		p = pingHeaders
+		timestamp = to_timestamps(p['Year'], p['Month'], p['Day'], p['Hour'], p['Minute'], p['Second'], p['HSeconds'])
+		return cls(timestamp, p['PingNumber'], p['SensorXcoordinate'], p['SensorYcoordinate'], p['SensorDepth'], p['SensorPrimaryAltitude'], p['SensorHeading'], p['SensorSpeed'])
+
+	@classmethod
+	def fromRecords(cls, records):
+		'''build from a list of XTFNAVIGATIONRECORD objects'''
+		return cls([r.timestamp for r in records], [r.pingNumber for r in records], [r.sensorX for r in records], [r.sensorY for r in records], [r.sensorDepth for r in records], [r.sensorAltitude for r in records], [r.sensorHeading for r in records], [r.sensorSpeed for r in records])
+
+	def columns(self):
+		return (self.timestamp, self.pingNumber, self.sensorX, self.sensorY, self.sensorDepth, self.sensorAltitude, self.sensorHeading, self.sensorSpeed)
+
+	def __len__(self):
+		return len(self.timestamp)
+
+	def __getitem__(self, i):
+		if isinstance(i, (slice, np.ndarray, list)):
+			return NavigationArray(*[c[i] for c in self.columns()])
+		ts = float(self.timestamp[i])
+		return XTFNAVIGATIONRECORD(ts, from_timestamp(ts), int(self.pingNumber[i]), float(self.sensorX[i]), float(self.sensorY[i]), float(self.sensorDepth[i]), float(self.sensorAltitude[i]), float(self.sensorHeading[i]), float(self.sensorSpeed[i]))
+
+	def __iter__(self):
+		for i in range(len(self)):
+			yield self[i]
+
+	def __str__(self):
+		return (pprint.pformat(vars(self)))
+
+class XTFQUICKSUMMARY:
+	'''time span, positions and estimated ping count of a file, see XTFReader.quickSummary()'''
+	def __init__(self, fileName, fileSize, firstPing, lastPing, estimatedPingCount):
+		self.fileName = fileName
+		self.fileSize = fileSize
+		self.firstPing = firstPing
+		self.lastPing = lastPing
+		self.startTime = firstPing.dateTime
+		self.endTime = lastPing.dateTime
+		self.firstPosition = (firstPing.sensorX, firstPing.sensorY)
+		self.lastPosition = (lastPing.sensorX, lastPing.sensorY)
+		self.estimatedPingCount = estimatedPingCount
+
+	def __str__(self):
+		return (pprint.pformat(vars(self)))
+
+class NavigationCache:
+	'''a directory of decoded navigation, one .nav.npz per XTF file, evicted least recently used first'''
+	version = 1
+
+	def __init__(self, cacheDir, maxBytes=500*1024*1024):
+		self.cacheDir = cacheDir
+		self.maxBytes = maxBytes
+		self.hits = 0
+		self.misses = 0
+		self.evictions = 0
+		if not os.path.isdir(cacheDir):
+			os.makedirs(cacheDir)
+
+	def entryName(self, fileName):
+		fileName = os.path.abspath(fileName)
+		key = hashlib.sha1(fileName.encode('utf-8')).hexdigest()[:16]
+		return os.path.join(self.cacheDir, "%s_%s.nav.npz" % (os.path.basename(fileName), key))
+
+	def get(self, fileName):
+		'''return the cached navigation for fileName, or None'''
+		entryName = self.entryName(fileName)
+		stat = os.stat(fileName)
+		try:
+			with np.load(entryName) as z:
+				if int(z['version']) != self.version or int(z['fileSize']) != stat.st_size or int(z['mtime']) != stat.st_mtime_ns:
+					return None
+				navigation = NavigationArray(z['timestamp'], z['pingNumber'], z['sensorX'], z['sensorY'], z['sensorDepth'], z['sensorAltitude'], z['sensorHeading'], z['sensorSpeed'])
+			# mark as recently used
+			os.utime(entryName)
+			return navigation
+		except (OSError, ValueError, KeyError):
+			# missing or damaged entries are simply rebuilt
+			return None
+
+	def put(self, fileName, navigation):
+		entryName = self.entryName(fileName)
+		stat = os.stat(fileName)
+		# write to a temporary and rename, so a worker process never sees a half written entry
+		tempName = "%s.%d.tmp" % (entryName, os.getpid())
+		with open(tempName, 'wb') as f:
+			np.savez(f, version=self.version, fileSize=stat.st_size, mtime=stat.st_mtime_ns, timestamp=navigation.timestamp, pingNumber=navigation.pingNumber, sensorX=navigation.sensorX, sensorY=navigation.sensorY,
+				sensorDepth=navigation.sensorDepth, sensorAltitude=navigation.sensorAltitude, sensorHeading=navigation.sensorHeading, sensorSpeed=navigation.sensorSpeed)
+		os.replace(tempName, entryName)
+		self.evict()
+
+	def evict(self):
+		'''remove the least recently used entries until the cache fits in maxBytes'''
+		entries = []
+		for name in os.listdir(self.cacheDir):
+			if not name.endswith('.nav.npz'):
+				continue
+			try:
+				stat = os.stat(os.path.join(self.cacheDir, name))
+			except OSError:
+				continue
+			entries.append((stat.st_mtime, stat.st_size, os.path.join(self.cacheDir, name)))
+		total = sum(entry[1] for entry in entries)
+		for mtime, size, entryName in sorted(entries):
+			if total <= self.maxBytes:
+				break
+			try:
+				os.remove(entryName)
+				self.evictions += 1
+			except OSError:
+				# another process got there first
+				pass
+			total -= size
+
+	def loadNavigation(self, reader):
+		'''return the navigation for reader, from the cache if possible'''
+		navigation = self.get(reader.fileName)
+		if navigation is not None:
+			self.hits += 1
+			return navigation
+		self.misses += 1
+		navigation = reader.loadNavigation()
+		self.put(reader.fileName, navigation)
+		return navigation
+
+	def __str__(self):
+		return "navigation cache %s: %d hits, %d misses, %d evicted" % (self.cacheDir, self.hits, self.misses, self.evictions)
+
+class XTFPINGBLOCK:
+	'''a block of consecutive sonar pings as a (pings, NumSamples) array per channel'''
+	def __init__(self, nPings, shape, pingHeaderDtype):
+		self.shape = shape
+		self.count = 0
+		self.pingHeaders = np.empty(nPings, dtype=pingHeaderDtype)
+		self.channels = {}
+		for channelIndex, NumSamples, dtype in shape:
+			self.channels[channelIndex] = np.empty((nPings, NumSamples), dtype=dtype)
+
+	def __len__(self):
+		return self.count
+
+	def append(self, buffer, offset, samples):
+		'''copy one ping into the next row'''
+		rows = self.pingHeaders.view(np.uint8).reshape(len(self.pingHeaders), -1)
+		rows[self.count] = np.frombuffer(buffer, dtype=np.uint8, count=rows.shape[1], offset=offset)
+		for channelIndex, data in samples.items():
+			self.channels[channelIndex][self.count] = data
+		self.count += 1
+
+	def full(self):
+		return self.count == len(self.pingHeaders)
+
+	def trim(self):
+		'''drop the unused rows of a block which was cut short'''
+		if not self.full():
+			self.pingHeaders = self.pingHeaders[:self.count]
+			for channelIndex in self.channels:
+				self.channels[channelIndex] = self.channels[channelIndex][:self.count]
+		return self
+
+class XTFINDEX:
+	'''header-only index of every packet, saved as a sidecar file next to the XTF file'''
+	version = 1
+
+	def __init__(self, offset, HeaderType, SubChannelNumber, NumBytesThisRecord, PingNumber, timestamp):
+		self.offset = offset
+		self.HeaderType = HeaderType
+		self.SubChannelNumber = SubChannelNumber
+		self.NumBytesThisRecord = NumBytesThisRecord
+		self.PingNumber = PingNumber # -1 for packets which are not sonar pings
+		self.timestamp = timestamp # nan for packets which are not sonar pings
+
+		# the sonar pings are what we seek on, so keep them handy for the binary searches
+		self.pings = np.flatnonzero(HeaderType == 0)
+
+	def __len__(self):
+		return len(self.offset)
+
+	def __str__(self):
+		return (pprint.pformat(vars(self)))
+
+	@staticmethod
+	def sidecarFileName(XTFfileName):
+		return XTFfileName + ".idx.npz"
+
+	def save(self, fileName, fileSize, mtime):
+		np.savez(fileName, version=self.version, fileSize=fileSize, mtime=mtime, offset=self.offset, HeaderType=self.HeaderType, SubChannelNumber=self.SubChannelNumber, NumBytesThisRecord=self.NumBytesThisRecord, PingNumber=self.PingNumber, timestamp=self.timestamp)
+
+	@classmethod
+	def load(cls, fileName, fileSize, mtime):
+		'''load a sidecar index.  returns None if there is no sidecar or it is stale'''
+		if not os.path.isfile(fileName):
+			return None
+		try:
+			with np.load(fileName) as z:
+				if int(z['version']) != cls.version or int(z['fileSize']) != fileSize or int(z['mtime']) != mtime:
+					return None
+				return cls(z['offset'], z['HeaderType'], z['SubChannelNumber'], z['NumBytesThisRecord'], z['PingNumber'], z['timestamp'])
+		except (OSError, ValueError, KeyError):
+			# a damaged sidecar is simply rebuilt
+			return None
+
+	def findPing(self, pingNumber):
+		'''the row of the first sonar ping with a ping number >= pingNumber, or None'''
+		i = np.searchsorted(self.PingNumber[self.pings], pingNumber, side='left')
+		if i >= len(self.pings):
+			return None
+		return self.pings[i]
+
+	def findTime(self, timestamp):
+		'''the row of the first sonar ping at or after timestamp, or None'''
+		i = np.searchsorted(self.timestamp[self.pings], timestamp, side='left')
+		if i >= len(self.pings):
+			return None
+		return self.pings[i]
+
+# one name per value in XTFPingHeader_fmt, used to build the numpy dtype for bulk decoding of the ping headers
+XTFPingHeader_names = ['Year', 'Month', 'Day', 'Hour', 'Minute', 'Second', 'HSeconds', 'JulianDays', 'EventNumber', 'PingNumber',
+	'SoundVelocity', 'OceanTide', 'Reserved2', 'ConductivityFreq', 'TemperatureFreq', 'PressureFreq', 'PressureTemp', 'Conductivity',
+	'WaterTemperature', 'Pressure', 'ComputedSoundVelocity', 'MagX', 'MagY', 'MagZ', 'AuxVal1', 'AuxVal2', 'AuxVal3', 'AuxVal4',
+	'AuxVal5', 'AuxVal6', 'SpeedLog', 'Turbidity', 'ShipSpeed', 'ShipGyro', 'ShipYcoordinate', 'ShipXcoordinate', 'ShipAltitiude',
+	'ShipDepth', 'FixTimeHour', 'FixTimeMinute', 'FixTimeSecond', 'FixTimeHsecond', 'SensorSpeed', 'KP', 'SensorYcoordinate',
+	'SensorXcoordinate', 'SonarStatus', 'RangeToTowFish', 'BearingToTowFish', 'CableOut', 'Layback', 'CableTension', 'SensorDepth',
+	'SensorPrimaryAltitude', 'SensorAuxAltitude', 'SensorPitch', 'SensorRoll', 'SensorHeading', 'Heave', 'Yaw', 'AttitudeTimeTag',
+	'DOT', 'NavFixMilliseconds', 'ComputerClockHour', 'ComputerClockMinute', 'ComputerClockSecond', 'ComputerClockHSecond',
+	'FishPositionDeltaX', 'FishPositionDeltaY', 'FishPositionErrorCode', 'OptionalOffset', 'CableOutHundredths', 'ReservedSpace2_1',
+	'ReservedSpace2_2', 'ReservedSpace2_3', 'ReservedSpace2_4', 'ReservedSpace2_5', 'ReservedSpace2_6']
+
+def structToDtype(fmt, names):
+	'''convert a struct format into the equivalent packed numpy dtype'''
+	codes = {'b': 'i1', 'B': 'u1', 'h': '<i2', 'H': '<u2', 'l': '<i4', 'L': '<u4', 'f': '<f4', 'd': '<f8'}
+	formats = []
+	count = ''
+	for c in fmt.lstrip('=<'):
+		if c.isdigit():
+			count += c
+		elif c == 's':
+			formats.append('S' + count)
+			count = ''
+		else:
+			formats.extend([codes[c]] * int(count or 1))
+			count = ''
+	return np.dtype({'names': names, 'formats': formats})
+
 class XTFPINGHEADER:
-	def __init__(self, fileptr, XTFFileHdr, SubChannelNumber, NumChansToFollow, NumBytesThisRecord):
+	def __init__(self, buffer, offset, XTFFileHdr, SubChannelNumber, NumChansToFollow, NumBytesThisRecord, selectedChannels=None):
+		'''decode a ping header and its channels from buffer at offset.  Channels not in selectedChannels are left as None'''
 		# start_time = time.time() # time the process
 
-		data = fileptr.read(XTFFileHdr.XTFPingHeader_len)
-		s = XTFFileHdr.XTFPingHeader_unpack(data)
+		s = XTFFileHdr.XTFPingHeader_unpack(buffer, offset)
 		
 		self.SubChannelNumber = SubChannelNumber #pass the parameter into the correct class
 		self.Year						   = s[0]
@@ -297,20 +624,27 @@ class XTFPINGHEADER:
 		# now read the chaninfo records.  This is more complex than it needs to be, but for now, read six channels
 		# start_time = time.time() # time the process
 		self.pingChannel =[]
+		offset += XTFFileHdr.XTFPingHeader_len
 		for i in range(NumChansToFollow):
-			ping = XTFPINGCHANHEADER(fileptr, XTFFileHdr, i)
+			if selectedChannels is not None and i not in selectedChannels:
+				# only read as far as NumSamples so we can step over the payload
+				NumSamples = XTFFileHdr.XTFPingChanHeader_NumSamples_unpack(buffer, offset + XTFFileHdr.XTFPingChanHeader_NumSamples_offset)[0]
+				self.pingChannel.append(None)
+				offset += XTFFileHdr.XTFPingChanHeader_len + XTFFileHdr.sampleDecoder(i, NumSamples)[1]
+				continue
+			ping = XTFPINGCHANHEADER(buffer, offset, XTFFileHdr, i)
 			self.pingChannel.append(ping)
+			offset += XTFFileHdr.XTFPingChanHeader_len + XTFFileHdr.sampleDecoder(i, ping.NumSamples)[1]
 		# print("--- %s.sss sample read duration ---" % (time.time() - start_time)) # print the processing time.
 
 	def __str__(self):
 		return (pprint.pformat(vars(self)))		
 				
 class XTFPINGCHANHEADER:
-	def __init__(self, fileptr, XTFFileHdr, channelIndex):
+	def __init__(self, buffer, offset, XTFFileHdr, channelIndex):
 		# print ("XTFPingChanHeader Length: ", XTFPingChanHeader_len)
 		
-		hdr = fileptr.read(XTFFileHdr.XTFPingChanHeader_len)
-		s = XTFFileHdr.XTFPingChanHeader_unpack(hdr)
+		s = XTFFileHdr.XTFPingChanHeader_unpack(buffer, offset)
 		self.ChannelNumber					= s[0]
 		self.DownsampleMethod				 = s[1]
 		self.SlantRange					   = s[2]
@@ -339,22 +673,15 @@ class XTFPINGCHANHEADER:
 		self.ReservedSpace3				   = s[25]
 		self.ReservedSpace4				   = s[26]
 
-		if XTFFileHdr.XTFChanInfo[channelIndex].UniPolar == 0: #polar mean signed data
-			if XTFFileHdr.XTFChanInfo[channelIndex].BytesPerSample == 1: #1 byte per sample
-				XTFdata_fmt = '=' + str(self.NumSamples) + 'b'
-			else:
-				XTFdata_fmt = '=' + str(self.NumSamples) + 'h'				
-		else: # we are using unipolar data
-			if XTFFileHdr.XTFChanInfo[channelIndex].BytesPerSample == 1: #1 byte per sample
-				XTFdata_fmt = '=' + str(self.NumSamples) + 'B'
-			else:
-				XTFdata_fmt = '=' + str(self.NumSamples) + 'H'				
-			
-		#now read the sonar data
-		XTFdata_len = struct.calcsize(XTFdata_fmt)
-		XTFdata_unpack = struct.Struct(XTFdata_fmt).unpack_from
-		blob = fileptr.read(XTFdata_len)
-		self.data = XTFdata_unpack(blob)
+		#now read the sonar data. The decoder for this shape of channel is built once per file and cached in the file header
+		XTFdata_unpack, XTFdata_len, XTFdata_dtype = XTFFileHdr.sampleDecoder(channelIndex, self.NumSamples)
+		offset += XTFFileHdr.XTFPingChanHeader_len
+		if isinstance(buffer, MemoryMap):
+			# zero copy. The samples are a read only numpy view straight onto the mapped file
+			self.data = np.frombuffer(buffer, dtype=XTFdata_dtype, count=self.NumSamples, offset=offset)
+		else:
+			# the packet buffer is reused for the next packet, so the samples are unpacked into a tuple
+			self.data = XTFdata_unpack(buffer, offset)
 		# print ("XTFdata_len: ", XTFdata_len)
 		
 		return
@@ -362,6 +689,145 @@ class XTFPINGCHANHEADER:
 	def __str__(self):
 		return (pprint.pformat(vars(self)))		
 		
+class XTFBATHHEADER(XTFPINGHEADER):
+	'''bathymetry packet (HeaderType 2).  The manufacturer specific data is kept as raw bytes'''
+	def __init__(self, buffer, offset, XTFFileHdr, SubChannelNumber, NumChansToFollow, NumBytesThisRecord):
+		XTFPINGHEADER.__init__(self, buffer, offset, XTFFileHdr, SubChannelNumber, 0, NumBytesThisRecord)
+		start = offset + XTFFileHdr.XTFPingHeader_len
+		end = offset - XTFReader.XTFPacketHeader_len + NumBytesThisRecord
+		self.data = bytes(buffer[start:end])
+
+class XTFNOTESHEADER:
+	'''annotation packet (HeaderType 1)'''
+	XTFNotes_fmt = '=h5b35s200s'
+	XTFNotes_len = struct.calcsize(XTFNotes_fmt)
+	XTFNotes_unpack = struct.Struct(XTFNotes_fmt).unpack_from
+
+	def __init__(self, buffer, offset, XTFFileHdr, SubChannelNumber, NumChansToFollow, NumBytesThisRecord):
+		s = self.XTFNotes_unpack(buffer, offset)
+		self.Year							= s[0]
+		self.Month							= s[1]
+		self.Day							= s[2]
+		self.Hour							= s[3]
+		self.Minute							= s[4]
+		self.Second							= s[5]
+		self.NotesText						= s[7].decode('utf-8', 'replace').rstrip('\x00')
+
+	def __str__(self):
+		return (pprint.pformat(vars(self)))
+
+class XTFATTITUDEDATA:
+	'''attitude packet (HeaderType 3) from a high rate motion reference unit'''
+	XTFAttitude_fmt = '=2LLL4fLfh5bhb'
+	XTFAttitude_len = struct.calcsize(XTFAttitude_fmt)
+	XTFAttitude_unpack = struct.Struct(XTFAttitude_fmt).unpack_from
+
+	def __init__(self, buffer, offset, XTFFileHdr, SubChannelNumber, NumChansToFollow, NumBytesThisRecord):
+		s = self.XTFAttitude_unpack(buffer, offset)
+		self.EpochMicroseconds				= s[2]
+		self.SourceEpoch					= s[3]
+		self.Pitch							= s[4]
+		self.Roll							= s[5]
+		self.Heave							= s[6]
+		self.Yaw							= s[7]
+		self.TimeTag						= s[8]
+		self.Heading						= s[9]
+		self.Year							= s[10]
+		self.Month							= s[11]
+		self.Day							= s[12]
+		self.Hour							= s[13]
+		self.Minutes						= s[14]
+		self.Seconds						= s[15]
+		self.Milliseconds					= s[16]
+
+	def __str__(self):
+		return (pprint.pformat(vars(self)))
+
+class XTFHEADERNAVIGATION:
+	'''raw navigation packet (HeaderType 42)'''
+	XTFNavigation_fmt = '=h5b3L3db6b'
+	XTFNavigation_len = struct.calcsize(XTFNavigation_fmt)
+	XTFNavigation_unpack = struct.Struct(XTFNavigation_fmt).unpack_from
+
+	def __init__(self, buffer, offset, XTFFileHdr, SubChannelNumber, NumChansToFollow, NumBytesThisRecord):
+		s = self.XTFNavigation_unpack(buffer, offset)
+		self.Year							= s[0]
+		self.Month							= s[1]
+		self.Day							= s[2]
+		self.Hour							= s[3]
+		self.Minute							= s[4]
+		self.Second							= s[5]
+		self.Microseconds					= s[6]
+		self.SourceEpoch					= s[7]
+		self.TimeTag						= s[8]
+		self.RawYcoordinate					= s[9]
+		self.RawXcoordinate					= s[10]
+		self.RawAltitude					= s[11]
+		self.TimeFlag						= s[12]
+
+	def __str__(self):
+		return (pprint.pformat(vars(self)))
+
+class XTFHEADERGYRO:
+	'''raw gyro packet (HeaderType 84)'''
+	XTFGyro_fmt = '=h5b3Lfb26s'
+	XTFGyro_len = struct.calcsize(XTFGyro_fmt)
+	XTFGyro_unpack = struct.Struct(XTFGyro_fmt).unpack_from
+
+	def __init__(self, buffer, offset, XTFFileHdr, SubChannelNumber, NumChansToFollow, NumBytesThisRecord):
+		s = self.XTFGyro_unpack(buffer, offset)
+		self.Year							= s[0]
+		self.Month							= s[1]
+		self.Day							= s[2]
+		self.Hour							= s[3]
+		self.Minute							= s[4]
+		self.Second							= s[5]
+		self.Microseconds					= s[6]
+		self.SourceEpoch					= s[7]
+		self.TimeTag						= s[8]
+		self.Gyro							= s[9]
+		self.TimeFlag						= s[10]
+
+	def __str__(self):
+		return (pprint.pformat(vars(self)))
+
+class XTFPOSRAWNAVIGATION:
+	'''POS MV raw navigation packet (HeaderType 107).  MicroSeconds is in units of 0.1 milliseconds'''
+	XTFPosRawNavigation_fmt = '=h5bh3d4fb'
+	XTFPosRawNavigation_len = struct.calcsize(XTFPosRawNavigation_fmt)
+	XTFPosRawNavigation_unpack = struct.Struct(XTFPosRawNavigation_fmt).unpack_from
+
+	def __init__(self, buffer, offset, XTFFileHdr, SubChannelNumber, NumChansToFollow, NumBytesThisRecord):
+		s = self.XTFPosRawNavigation_unpack(buffer, offset)
+		self.Year							= s[0]
+		self.Month							= s[1]
+		self.Day							= s[2]
+		self.Hour							= s[3]
+		self.Minutes						= s[4]
+		self.Seconds						= s[5]
+		self.MicroSeconds					= s[6]
+		self.RawYcoordinate					= s[7]
+		self.RawXcoordinate					= s[8]
+		self.RawAltitude					= s[9]
+		self.Pitch							= s[10]
+		self.Roll							= s[11]
+		self.Heave							= s[12]
+		self.Heading						= s[13]
+
+	def __str__(self):
+		return (pprint.pformat(vars(self)))
+
+# the packet decoders keyed on HeaderType.  Register a class here to decode a new packet type.  Each is constructed as decoder(buffer, offset, XTFFileHdr, SubChannelNumber, NumChansToFollow, NumBytesThisRecord) with offset pointing just past the packet header
+XTFPacketDecoders = {
+	0: XTFPINGHEADER,
+	1: XTFNOTESHEADER,
+	2: XTFBATHHEADER,
+	3: XTFATTITUDEDATA,
+	42: XTFHEADERNAVIGATION,
+	84: XTFHEADERGYRO,
+	107: XTFPOSRAWNAVIGATION,
+}
+
 class XTFCHANINFO:
 	def __init__(self, fileptr, XTFFileHdr):
 
@@ -403,6 +869,7 @@ class XTFFILEHDR:
 		XTFPingHeader_fmt = '=h6bh2L2fL21f2d2h4b2f2d4h10fLfL4b2hBL7b'
 		self.XTFPingHeader_len = struct.calcsize(XTFPingHeader_fmt)
 		self.XTFPingHeader_unpack = struct.Struct(XTFPingHeader_fmt).unpack_from
+		self.XTFPingHeader_dtype = structToDtype(XTFPingHeader_fmt, XTFPingHeader_names)
 
 		XTFChanInfo_fmt = '=bb3hl16s11fhb53s'
 		self.XTFChanInfo_len = struct.calcsize(XTFChanInfo_fmt)
@@ -411,6 +878,9 @@ class XTFFILEHDR:
 		XTFPingChanHeader_fmt = '=2h5f5hLh2bLhf2bfh4b'
 		self.XTFPingChanHeader_len = struct.calcsize(XTFPingChanHeader_fmt)
 		self.XTFPingChanHeader_unpack = struct.Struct(XTFPingChanHeader_fmt).unpack_from
+		# NumSamples on its own, for channels we are skipping
+		self.XTFPingChanHeader_NumSamples_offset = struct.calcsize('=2h5f5hLh2b')
+		self.XTFPingChanHeader_NumSamples_unpack = struct.Struct('=L').unpack_from
 
 		data = fileptr.read(XTFFileHdr_len)
 		s = XTFFileHdr_unpack(data)
@@ -454,83 +924,719 @@ class XTFFILEHDR:
 			self.XTFChanInfo.append(ch)
 			
 		# there can be more than 6 channels.  If so, we need to read another 1024 bytes here.  As we do not have an example of this, the code is not written
+
+		# sample decoders keyed on (channel index, NumSamples, UniPolar, BytesPerSample)
+		self.sampleDecoders = {}
+
+	def sampleDecoder(self, channelIndex, NumSamples):
+		'''the (unpack, length, dtype) to decode the samples of a channel, cached per shape'''
+		chanInfo = self.XTFChanInfo[channelIndex]
+		key = (channelIndex, NumSamples, chanInfo.UniPolar, chanInfo.BytesPerSample)
+		decoder = self.sampleDecoders.get(key)
+		if decoder is None:
+			if chanInfo.UniPolar == 0: #polar mean signed data
+				if chanInfo.BytesPerSample == 1: #1 byte per sample
+					XTFdata_fmt = '=' + str(NumSamples) + 'b'
+					XTFdata_dtype = np.int8
+				else:
+					XTFdata_fmt = '=' + str(NumSamples) + 'h'
+					XTFdata_dtype = np.dtype('<i2')
+			else: # we are using unipolar data
+				if chanInfo.BytesPerSample == 1: #1 byte per sample
+					XTFdata_fmt = '=' + str(NumSamples) + 'B'
+					XTFdata_dtype = np.uint8
+				else:
+					XTFdata_fmt = '=' + str(NumSamples) + 'H'
+					XTFdata_dtype = np.dtype('<u2')
+			decoder = (struct.Struct(XTFdata_fmt).unpack_from, struct.calcsize(XTFdata_fmt), XTFdata_dtype)
+			self.sampleDecoders[key] = decoder
+		return decoder
 		
 	def __str__(self):
 		return (pprint.pformat(vars(self)))
 
+class XTFPrefetcher:
+	'''file-like object which reads ahead in chunks on a background thread'''
+	def __init__(self, fileName, depth=4, chunkSize=1048576):
+		self.raw = open(fileName, 'rb', buffering=0)
+		self.depth = depth
+		self.chunkSize = chunkSize
+		self.stalls = 0
+		self.chunksRead = 0
+		self.restarts = 0
+		self.thread = None
+		self.start(0)
+
+	def start(self, position):
+		'''(re)start the read ahead thread at position'''
+		self.stop()
+		# one more buffer than the queue depth so the reader thread always has one to fill while the queue is full
+		self.free = queue.Queue()
+		for i in range(self.depth + 1):
+			self.free.put(bytearray(self.chunkSize))
+		self.full = queue.Queue(maxsize=self.depth)
+		self.stopping = threading.Event()
+		self.chunk = None
+		self.chunkStart = position
+		self.chunkLength = 0
+		self.position = position
+		self.eof = False
+		self.thread = threading.Thread(target=self.readAhead, args=(position, self.stopping))
+		self.thread.daemon = True
+		self.thread.start()
+
+	def stop(self):
+		if self.thread is None:
+			return
+		self.stopping.set()
+		# keep draining so a thread blocked on a full queue can see the stop flag
+		while self.thread.is_alive():
+			try:
+				self.free.put(self.full.get(timeout=0.01)[1])
+			except queue.Empty:
+				pass
+		self.thread.join()
+		self.thread = None
+
+	def readAhead(self, position, stopping):
+		self.raw.seek(position, 0)
+		while not stopping.is_set():
+			buffer = self.free.get()
+			length = self.raw.readinto(buffer)
+			self.full.put((position, buffer, length))
+			position += length
+			if length == 0:
+				# end of file marker
+				break
+
+	def nextChunk(self):
+		'''retire the current chunk and wait for the next.  Returns False at end of file'''
+		if self.eof:
+			return False
+		if self.chunk is not None:
+			self.free.put(self.chunk)
+			self.chunk = None
+		if self.full.empty():
+			self.stalls += 1
+		self.chunkStart, self.chunk, self.chunkLength = self.full.get()
+		self.chunksRead += 1
+		if self.chunkLength == 0:
+			self.eof = True
+			return False
+		return True
+
+	def readinto(self, view):
+		view = memoryview(view).cast('B')
+		count = 0
+		while count < len(view):
+			available = self.chunkStart + self.chunkLength - self.position
+			if available <= 0:
+				if not self.nextChunk():
+					break
+				continue
+			n = min(available, len(view) - count)
+			start = self.position - self.chunkStart
+			view[count:count+n] = self.chunk[start:start+n]
+			count += n
+			self.position += n
+		return count
+
+	def read(self, size):
+		data = bytearray(size)
+		return bytes(data[:self.readinto(data)])
+
+	def tell(self):
+		return self.position
+
+	def seek(self, offset, whence=0):
+		if whence == 1:
+			offset += self.position
+		elif whence == 2:
+			offset += os.fstat(self.raw.fileno()).st_size
+		if self.chunkStart <= offset <= self.chunkStart + self.chunkLength or (offset > self.position and offset - self.position < self.depth * self.chunkSize):
+			# served from what is already buffered or on its way. readinto skips forward through the chunks
+			while offset > self.chunkStart + self.chunkLength and self.nextChunk():
+				pass
+			self.position = offset
+		else:
+			self.restarts += 1
+			self.start(offset)
+		return self.position
+
+	def fileno(self):
+		return self.raw.fileno()
+
+	def close(self):
+		self.stop()
+		self.raw.close()
+
 class XTFReader:
 	XTFPacketHeader_fmt = '=h2b3hL'
 	XTFPacketHeader_len = struct.calcsize(XTFPacketHeader_fmt)
 	XTFPacketHeader_unpack = struct.Struct(XTFPacketHeader_fmt).unpack_from
+	# 0xFACE as it appears on disk
+	XTFMagicNumber = b'\xce\xfa'
+
+	# the packet header followed by the leading time and ping number fields of the ping header.  This is all the indexer needs to read
+	XTFPingTime_fmt = XTFPacketHeader_fmt + 'h6bh2L'
+	XTFPingTime_len = struct.calcsize(XTFPingTime_fmt)
+	XTFPingTime_unpack = struct.Struct(XTFPingTime_fmt).unpack_from
 
-	def __init__(self, XTFfileName):
+	def __init__(self, XTFfileName, mmap=False, bufferSize=65536, prefetch=False, prefetchDepth=4, prefetchChunkSize=1048576, validate=False):
+		'''open an XTF file, optionally memory mapped, prefetched or validated'''
 		if not os.path.isfile(XTFfileName):
 			print ("file not found:", XTFfileName)
 		self.fileName = XTFfileName
-		self.fileptr = open(XTFfileName, 'rb')		
-		self.fileSize = self.fileptr.seek(0, 2)
+		self.mmap = mmap
+		# each packet is read into this buffer with readinto and decoded from offsets, so reading a packet allocates nothing
+		self.packetBuffer = bytearray(bufferSize)
+		self.packetView = memoryview(self.packetBuffer)
+		self.prefetcher = None
+		if prefetch and not mmap:
+			# the prefetcher supports read, readinto, seek and tell, so it stands in for the file pointer
+			self.prefetcher = XTFPrefetcher(XTFfileName, prefetchDepth, prefetchChunkSize)
+			self.fileptr = self.prefetcher
+		else:
+			self.fileptr = open(XTFfileName, 'rb', buffering=bufferSize)		
+		if mmap:
+			# the mapping supports read, seek and tell, so it stands in for the file pointer
+			self.filehandle = self.fileptr
+			self.fileptr = MemoryMap(self.filehandle.fileno(), 0, access=ACCESS_READ)
+		self.fileSize = os.path.getsize(XTFfileName)
+		# check every packet before it is used and skip corrupt ones, recording the (start, end) byte ranges skipped
+		self.validate = validate
+		self.skippedRanges = []
+		# a second unbuffered handle for peek(), so validating and quickSummary() never disturb the buffered or prefetched reads.  Opened on first use
+		self.scanptr = None
 		# go back to start of file
 		self.fileptr.seek(0, 0)				
 		self.XTFFileHdr = XTFFILEHDR(self.fileptr)
+		self.firstPacketPosition = self.fileptr.tell()
+		# the packet index, see loadIndex()
+		self.index = None
+		self.selectedChannels = None
+		# the packet types readPacket() decodes.  Everything else is skipped with a seek
+		self.subscribedTypes = {0}
 			
 	def __str__(self):
 		return pprint.pformat(vars(self))
 
+	def __iter__(self):
+		'''iterate over the subscribed packets, by default the sonar pings'''
+		while self.moreData():
+			packet = self.readPacket()
+			if packet is not None:
+				yield packet
+
+	def subscribe(self, headerTypes):
+		'''choose which packet types readPacket() decodes, e.g. [0, 3] for sonar pings and attitude'''
+		headerTypes = set(headerTypes)
+		unsupported = headerTypes.difference(XTFPacketDecoders)
+		if len(unsupported) > 0:
+			raise ValueError("no decoder for packet types %s" % (sorted(unsupported)))
+		self.subscribedTypes = headerTypes
+		return sorted(headerTypes)
+
+	def selectChannels(self, channels=None, frequency=None):
+		'''choose the channels to decode by index, name or frequency.  No arguments selects them all'''
+		if channels is None and frequency is None:
+			self.selectedChannels = None
+			return None
+		# only the channels in use, the rest of the six XTFChanInfo slots are unused
+		numChannels = min(self.XTFFileHdr.NumberOfSonarChannels + self.XTFFileHdr.NumberOfBathymetryChannels, len(self.XTFFileHdr.XTFChanInfo))
+		chanInfo = self.XTFFileHdr.XTFChanInfo[:numChannels]
+		selected = set()
+		for channel in (channels or []):
+			if isinstance(channel, str):
+				matches = [i for i, ch in enumerate(chanInfo) if ch.ChannelName == channel]
+				if len(matches) == 0:
+					raise ValueError("no channel named %s" % channel)
+				selected.update(matches)
+			else:
+				if not 0 <= int(channel) < numChannels:
+					raise ValueError("channel %s is out of range, the file has %d channels" % (channel, numChannels))
+				selected.add(int(channel))
+		if frequency is not None:
+			frequencies = np.atleast_1d(frequency)
+			matches = [i for i, ch in enumerate(chanInfo) if np.any(np.isclose(ch.Frequency, frequencies))]
+			if len(matches) == 0:
+				raise ValueError("no channel with frequency %s" % frequency)
+			selected.update(matches)
+		self.selectedChannels = selected
+		return sorted(selected)
+
+	def iterBlocks(self, nPings, channels=None):
+		'''iterate over XTFPINGBLOCK objects of up to nPings sonar pings'''
+		XTFFileHdr = self.XTFFileHdr
+		if channels is None:
+			channels = self.selectedChannels
+		block = None
+		while self.moreData():
+			currentPacketPosition = self.packetPosition()
+			if currentPacketPosition is None:
+				break
+			HeaderType, SubChannelNumber, NumChansToFollow, NumBytesThisRecord = self.readPacketheader()
+			if HeaderType != 0:
+				self.fileptr.seek(currentPacketPosition + NumBytesThisRecord, 0)
+				continue
+			if self.mmap:
+				buffer = self.fileptr
+				pingOffset = currentPacketPosition + self.XTFPacketHeader_len
+			else:
+				buffer = self.readRecord(self.XTFPacketHeader_len, NumBytesThisRecord)
+				pingOffset = self.XTFPacketHeader_len
+			self.fileptr.seek(currentPacketPosition + NumBytesThisRecord, 0)
+
+			# find the samples of the wanted channels without building any per ping objects
+			samples = {}
+			offset = pingOffset + XTFFileHdr.XTFPingHeader_len
+			for i in range(NumChansToFollow):
+				NumSamples = XTFFileHdr.XTFPingChanHeader_NumSamples_unpack(buffer, offset + XTFFileHdr.XTFPingChanHeader_NumSamples_offset)[0]
+				XTFdata_unpack, XTFdata_len, XTFdata_dtype = XTFFileHdr.sampleDecoder(i, NumSamples)
+				if channels is None or i in channels:
+					samples[i] = np.frombuffer(buffer, dtype=XTFdata_dtype, count=NumSamples, offset=offset + XTFFileHdr.XTFPingChanHeader_len)
+				offset += XTFFileHdr.XTFPingChanHeader_len + XTFdata_len
+			shape = tuple((i, len(data), data.dtype) for i, data in samples.items())
+
+			if block is not None and block.shape != shape:
+				# the sample counts changed, so split here
+				yield block.trim()
+				block = None
+			if block is None:
+				block = XTFPINGBLOCK(nPings, shape, XTFFileHdr.XTFPingHeader_dtype)
+			block.append(buffer, pingOffset, samples)
+			del samples
+			if block.full():
+				yield block
+				block = None
+		if block is not None:
+			yield block.trim()
+
 	def close(self):
-		self.fileptr.close()
+		if self.mmap:
+			try:
+				self.fileptr.close()
+			except BufferError:
+				# sample views are still in use, so the map is released when the last of them goes out of scope
+				pass
+			self.filehandle.close()
+		else:
+			self.fileptr.close()
+		if self.scanptr is not None:
+			self.scanptr.close()
 		
 	def rewind(self):
 		# go back to start of file
 		self.fileptr.seek(0, 0)				
+		sampleDecoders = self.XTFFileHdr.sampleDecoders
 		self.XTFFileHdr = XTFFILEHDR(self.fileptr)
+		# same file, same channels, so keep the decoders we have already compiled
+		self.XTFFileHdr.sampleDecoders = sampleDecoders
 		
 	def moreData(self):
 		bytesRemaining = self.fileSize - self.fileptr.tell()
 		# print ("current file ptr position:", self.fileptr.tell())
 		return bytesRemaining
-			
+
+	def buildIndex(self):
+		'''make a header-only pass through the file indexing every packet'''
+		start_time = time.time() # time the process
+		# leave the reader where the caller had it
+		position = self.fileptr.tell()
+		offsets = array.array('q')
+		headerTypes = array.array('B')
+		subChannels = array.array('B')
+		numBytes = array.array('L')
+		pingFields = array.array('q')
+		pingRows = array.array('q')
+
+		packetPosition = self.firstPacketPosition
+		while packetPosition + self.XTFPacketHeader_len <= self.fileSize:
+			if self.validate and not self.validPacketAt(packetPosition):
+				packetPosition = self.skipCorrupt(packetPosition)
+				continue
+			self.fileptr.seek(packetPosition, 0)
+			data = self.fileptr.read(self.XTFPingTime_len)
+			s = self.XTFPacketHeader_unpack(data)
+			HeaderType = s[1] & 0xFF
+			NumBytesThisRecord = s[6]
+			if NumBytesThisRecord < self.XTFPacketHeader_len:
+				# a corrupt record length would loop forever, so stop here
+				print ("invalid packet length %s at byte offset %s, index stopped" % (NumBytesThisRecord, packetPosition))
+				break
+			if HeaderType == 0 and len(data) == self.XTFPingTime_len:
+				# Year, Month, Day, Hour, Minute, Second, HSeconds, PingNumber
+				p = self.XTFPingTime_unpack(data)
+				pingRows.append(len(offsets))
+				pingFields.extend(p[7:14] + p[16:17])
+			offsets.append(packetPosition)
+			headerTypes.append(HeaderType)
+			subChannels.append(s[2] & 0xFF)
+			numBytes.append(NumBytesThisRecord)
+			packetPosition += NumBytesThisRecord
+
+		count = len(offsets)
+		pingNumber = np.full(count, -1, dtype=np.int64)
+		timestamp = np.full(count, np.nan, dtype=np.float64)
+		if len(pingRows):
+			pingRows = np.frombuffer(pingRows, dtype=np.int64)
+			f = np.frombuffer(pingFields, dtype=np.int64).reshape(-1, 8)
+			pingNumber[pingRows] = f[:,7]
+			timestamp[pingRows] = to_timestamps(f[:,0], f[:,1], f[:,2], f[:,3], f[:,4], f[:,5], f[:,6])
+
+		self.index = XTFINDEX(np.frombuffer(offsets, dtype=np.int64), np.frombuffer(headerTypes, dtype=np.uint8), np.frombuffer(subChannels, dtype=np.uint8), np.array(numBytes, dtype=np.uint32), pingNumber, timestamp)
+		self.fileptr.seek(position, 0)
+		print("Build packet index Duration %.3fs" % (time.time() - start_time)) # print the processing time.
+		return self.index
+
+	def loadIndex(self, useSidecar=True):
+		'''return the packet index, from the sidecar file if it is still valid'''
+		if self.index is not None:
+			return self.index
+		st = os.stat(self.fileName)
+		sidecar = XTFINDEX.sidecarFileName(self.fileName)
+		if useSidecar:
+			self.index = XTFINDEX.load(sidecar, st.st_size, st.st_mtime_ns)
+		if self.index is None:
+			self.buildIndex()
+			if useSidecar:
+				try:
+					self.index.save(sidecar, st.st_size, st.st_mtime_ns)
+				except OSError:
+					# read only media.  The index still works, it just is not persisted
+					pass
+		return self.index
+
+	def seekPing(self, pingNumber):
+		'''position the file at the first sonar ping >= pingNumber.  Returns the offset or None'''
+		index = self.loadIndex()
+		row = index.findPing(pingNumber)
+		if row is None:
+			return None
+		self.fileptr.seek(int(index.offset[row]), 0)
+		return int(index.offset[row])
+
+	def seekTime(self, t):
+		'''position the file at the first sonar ping at or after time t.  Returns the offset or None'''
+		if isinstance(t, datetime):
+			t = to_timestamp(t)
+		index = self.loadIndex()
+		row = index.findTime(t)
+		if row is None:
+			return None
+		self.fileptr.seek(int(index.offset[row]), 0)
+		return int(index.offset[row])
+
+	def readPingHeaders(self, fields=None):
+		'''decode the ping header of every sonar ping into a structured array.  Saves a sidecar index on first use'''
+		start_time = time.time() # time the process
+		dtype = self.XTFFileHdr.XTFPingHeader_dtype
+		if fields is None:
+			fields = dtype.names
+		if len(fields) == 0:
+			raise ValueError("no ping header fields requested")
+		for f in fields:
+			if f not in dtype.fields:
+				raise ValueError("unknown ping header field: %s" % f)
+		outdtype = np.dtype([(f, dtype.fields[f][0]) for f in fields])
+		# byte columns of the requested fields within the ping header
+		columns = np.concatenate([np.arange(dtype.fields[f][1], dtype.fields[f][1] + dtype.fields[f][0].itemsize) for f in fields])
+
+		index = self.loadIndex()
+		offsets = index.offset[index.pings] + self.XTFPacketHeader_len
+		pingHeaders = np.empty(len(offsets), dtype=outdtype)
+		out = pingHeaders.view(np.uint8).reshape(len(offsets), outdtype.itemsize)
+
+		mapping = self.fileptr if self.mmap else MemoryMap(self.fileptr.fileno(), 0, access=ACCESS_READ)
+		raw = np.frombuffer(mapping, dtype=np.uint8)
+		# gather the bytes in blocks so the temporary gather indices stay small on very long lines
+		blockSize = 16384
+		for i in range(0, len(offsets), blockSize):
+			block = offsets[i:i+blockSize]
+			out[i:i+len(block)] = raw[block[:,None] + columns[None,:]]
+		del raw
+		if not self.mmap:
+			mapping.close()
+		print("Read ping headers Duration %.3fs" % (time.time() - start_time)) # print the processing time.
+		return pingHeaders
+
+	def nextPingPosition(self, position):
+		'''the offset and length of the first sonar ping at or after position, or (None, None)'''
+		while True:
+			header = self.peek(position, self.XTFPacketHeader_len)
+			if len(header) < self.XTFPacketHeader_len or header[:2] != self.XTFMagicNumber:
+				return None, None
+			s = self.XTFPacketHeader_unpack(header)
+			if s[1] & 0xFF == 0:
+				return position, s[6]
+			if s[6] < self.XTFPacketHeader_len:
+				return None, None
+			position += s[6]
+
+	def lastPingPosition(self, firstPosition, tailSize=65536):
+		'''the offset of the last complete sonar ping, searching back from the end of the file'''
+		blockStart = self.fileSize
+		while blockStart > firstPosition:
+			blockEnd = blockStart + 1
+			blockStart = max(firstPosition, self.fileSize - tailSize)
+			data = np.frombuffer(self.peek(blockStart, min(blockEnd, self.fileSize) - blockStart), dtype=np.uint8)
+			candidates = np.flatnonzero((data[:-1] == self.XTFMagicNumber[0]) & (data[1:] == self.XTFMagicNumber[1]))
+			del data
+			for i in candidates[::-1]:
+				position = blockStart + int(i)
+				if self.peek(position + 2, 1)[0] == 0 and self.chainedPacketAt(position):
+					return position
+			tailSize *= 2
+		# nothing complete after the first ping
+		return firstPosition
+
+	def pingTime(self, position):
+		'''the unix timestamp of the sonar ping at position'''
+		p = self.XTFPingTime_unpack(self.peek(position, self.XTFPingTime_len))
+		return float(to_timestamps(p[7], p[8], p[9], p[10], p[11], p[12], p[13]))
+
+	def peekNavigation(self, positions):
+		'''decode the navigation of the sonar pings at positions from their ping headers'''
+		pingHeaders = b''.join(self.peek(position + self.XTFPacketHeader_len, self.XTFFileHdr.XTFPingHeader_len) for position in positions)
+		return NavigationArray.fromPingHeaders(np.frombuffer(pingHeaders, dtype=self.XTFFileHdr.XTFPingHeader_dtype))
+
+	def quickSummary(self, tailSize=65536):
+		'''summarise the file from its first and last sonar pings.  Returns an XTFQUICKSUMMARY or None'''
+		start_time = time.time() # time the process
+		firstPosition, recordLength = self.nextPingPosition(self.firstPacketPosition)
+		if firstPosition is None:
+			return None
+		lastPosition = self.lastPingPosition(firstPosition, tailSize)
+
+		navigation = self.peekNavigation([firstPosition, lastPosition])
+		# assume every record is as long as the first
+		estimatedPingCount = int(round((lastPosition - firstPosition) / recordLength)) + 1
+		print("Quick summary Duration %.3fs" % (time.time() - start_time)) # print the processing time.
+		return XTFQUICKSUMMARY(self.fileName, self.fileSize, navigation[0], navigation[1], estimatedPingCount)
+
+	def sampleNavigation(self, step):
+		'''return the navigation of the pings decimateNavigation() would keep, reading only those pings'''
+		start_time = time.time() # time the process
+		if self.index is not None:
+			pings = self.index.pings
+			if len(pings) == 0:
+				positions = []
+			else:
+				# the same fixes decimateNavigation() keeps
+				rows = decimateTimestamps(self.index.timestamp[pings], step)
+				positions = self.index.offset[pings[rows]].tolist()
+		else:
+			# no index, so seek to where each ping should be from the byte rate of the file
+			positions = self.samplePingPositions(step)
+		navigation = self.peekNavigation(positions)
+		print("Sample navigation Duration %.3fs" % (time.time() - start_time)) # print the processing time.
+		return navigation
+
+	def samplePingPositions(self, step):
+		'''the offsets of the pings sampleNavigation() keeps when there is no packet index'''
+		position, length = self.nextPingPosition(self.firstPacketPosition)
+		if position is None:
+			return []
+		recordLength = length
+		chunkSize = max(4 * recordLength, 4096)
+		lastPosition = self.lastPingPosition(position)
+		lastTime = self.pingTime(lastPosition)
+		positions = [position]
+		t = self.pingTime(position)
+		# bytes per second between the first and last pings
+		rate = (lastPosition - position) / max(lastTime - t, 1e-6)
+		while lastTime - t >= step:
+			# aim a couple of records early, so we normally only need to step forward
+			guess = positions[-1] + int(step * rate) - 2 * recordLength
+			nextPacket = positions[-1] + length
+			if guess <= nextPacket:
+				# the next packet
+				guess = nextPacket
+			else:
+				guess = self.resync(guess, limit=lastPosition, chunkSize=chunkSize)
+			position, length = self.nextPingPosition(guess)
+			if position is None:
+				break
+			if guess > nextPacket and self.pingTime(position) - t >= step:
+				# the ping rate has dropped and the guess may have gone past the pings we want, so search back from it
+				position, length = self.firstPingAfter(positions[-1], position, t, step, chunkSize)
+			while position is not None and position < lastPosition and self.pingTime(position) - t < step:
+				position, length = self.nextPingPosition(position + length)
+			if position is None or position > lastPosition:
+				break
+			pingTime = self.pingTime(position)
+			if pingTime > t:
+				rate = (position - positions[-1]) / (pingTime - t)
+			positions.append(position)
+			t = pingTime
+			if position == lastPosition:
+				break
+		# now add the very last ping
+		positions.append(lastPosition)
+		return positions
+
+	def firstPingAfter(self, low, high, t, step, chunkSize):
+		'''bisect between the pings at low and high for the first ping at least step seconds after t'''
+		highLength = self.nextPingPosition(high)[1]
+		# no ping starts between end and high
+		end = high
+		while end - low > chunkSize:
+			mid = (low + end) // 2
+			position, length = self.nextPingPosition(self.resync(mid, limit=end, chunkSize=chunkSize))
+			if position is None or position >= end:
+				end = mid
+			elif self.pingTime(position) - t >= step:
+				high, highLength = position, length
+				end = position
+			else:
+				low = position
+		# step forward over the few pings left
+		position, length = self.nextPingPosition(low)
+		position, length = self.nextPingPosition(position + length)
+		while position is not None and position < high and self.pingTime(position) - t < step:
+			position, length = self.nextPingPosition(position + length)
+		if position is None or position >= high:
+			return high, highLength
+		return position, length
+
 	def loadNavigation(self):
-		navigation = []
+		'''scan the ping headers for navigation and return it as a NavigationArray'''
 		start_time = time.time() # time the process
+		pingHeaders = bytearray()
 		while self.moreData():
-			pingHdr = self.readPacket()
-			if pingHdr != None:
-				# we need to calculate the approximate speed, so need the ping interval
-				d = datetime (pingHdr.Year, pingHdr.Month, pingHdr.Day, pingHdr.Hour, pingHdr.Minute, pingHdr.Second, pingHdr.HSeconds * 10000)
-				r = XTFNAVIGATIONRECORD(to_timestamp(d), d, pingHdr.PingNumber, pingHdr.SensorXcoordinate, pingHdr.SensorYcoordinate, pingHdr.SensorDepth, pingHdr.SensorPrimaryAltitude, pingHdr.SensorHeading, pingHdr.SensorSpeed)
-				navigation.append(r)
-			
+			currentPacketPosition = self.packetPosition()
+			if currentPacketPosition is None:
+				break
+			HeaderType, SubChannelNumber, NumChansToFollow, NumBytesThisRecord = self.readPacketheader()
+			if HeaderType == 0:
+				pingHeaders += self.fileptr.read(self.XTFFileHdr.XTFPingHeader_len)
+			# we only need the ping header for navigation, so never touch the sample data
+			self.fileptr.seek(currentPacketPosition + NumBytesThisRecord, 0)
+		# decode all the headers in one go rather than building an object per ping
+		navigation = NavigationArray.fromPingHeaders(np.frombuffer(bytes(pingHeaders), dtype=self.XTFFileHdr.XTFPingHeader_dtype))
+
 		self.rewind()
 		print("Get navigation Range Duration %.3fs" % (time.time() - start_time)) # print the processing time.
 		return (navigation)
 	
 	def computeSpeedFromPositions(self, navData):
-		if (navData[0].sensorX <= 180) & (navData[0].sensorY <= 90): #data is in geographicals
-			for r in range(len(navData) - 1):
-				rng, bearing12, bearing21 = geodetic.calculateRangeBearingFromGeographicals(navData[r].sensorX, navData[r].sensorY, navData[r+1].sensorX, navData[r+1].sensorY)			   
-				# now we have the range, comput the speed in metres/second. where speed = distance/time
-				navData[r].sensorSpeed = rng / (navData[r+1].dateTime.timestamp() - navData[r].dateTime.timestamp())			 
+		if not isinstance(navData, NavigationArray):
+			navData = NavigationArray.fromRecords(navData)
+		x = navData.sensorX
+		y = navData.sensorY
+		t = navData.timestamp
+		if (x[0] <= 180) & (y[0] <= 90): #data is in geographicals
+			rng, bearing12, bearing21 = geodetic.calculateRangeBearingFromGeographicalsArray(x[:-1], y[:-1], x[1:], y[1:])
 		else:
-			for r in range(len(navData) - 1):
-				rng, bearing12, bearing21 = geodetic.calculateRangeBearingFromGridPosition(navData[r].sensorX, navData[r].sensorY, navData[r+1].sensorX, navData[r+1].sensorY)			   
-				# now we have the range, comput the speed in metres/second. where speed = distance/time
-				navData[r].sensorSpeed = rng / (navData[r+1].dateTime.timestamp() - navData[r].dateTime.timestamp())			 
+			rng, bearing12 = geodetic.calculateRangeBearingFromGridPositionArray(x[:-1], y[:-1], x[1:], y[1:])
+		# now we have the range, comput the speed in metres/second. where speed = distance/time
+		navData.sensorSpeed[:-1] = rng / np.diff(t)
 				
 		# now smooth the sensorSpeed
-		speeds = [o.sensorSpeed for o in navData]
-		npspeeds=np.array(speeds)
-		
-		smoothSpeed = geodetic.medfilt(npspeeds, 5)
+		smoothSpeed = geodetic.medfilt(navData.sensorSpeed, 5)
 		meanSpeed = float(np.mean(smoothSpeed))
 		
-		for r in range(len(navData) - 1):
-			navData[r].sensorSpeed = float (smoothSpeed[r])
+		navData.sensorSpeed[:-1] = smoothSpeed[:-1]
 
 		return meanSpeed, navData
 		  
+	def peek(self, position, length):
+		'''return up to length bytes from position without moving the file pointer'''
+		if self.mmap:
+			return self.fileptr[position:position+length]
+		if self.scanptr is None:
+			self.scanptr = open(self.fileName, 'rb', buffering=0)
+		self.scanptr.seek(position, 0)
+		return self.scanptr.read(length)
+
+	def packetLengthAt(self, position):
+		'''the record length of a plausible packet at position, otherwise None'''
+		header = self.peek(position, self.XTFPacketHeader_len)
+		if len(header) < self.XTFPacketHeader_len or header[:2] != self.XTFMagicNumber:
+			return None
+		s = self.XTFPacketHeader_unpack(header)
+		NumBytesThisRecord = s[6]
+		if NumBytesThisRecord < self.XTFPacketHeader_len or (s[1] & 0xFF == 0 and NumBytesThisRecord < self.XTFPacketHeader_len + self.XTFFileHdr.XTFPingHeader_len):
+			return None
+		if position + NumBytesThisRecord > self.fileSize:
+			return None
+		if s[1] & 0xFF == 0:
+			# the channels of a sonar ping must fit inside the record
+			XTFFileHdr = self.XTFFileHdr
+			if s[3] > len(XTFFileHdr.XTFChanInfo):
+				return None
+			offset = position + self.XTFPacketHeader_len + XTFFileHdr.XTFPingHeader_len
+			for i in range(s[3]):
+				NumSamples = XTFFileHdr.XTFPingChanHeader_NumSamples_unpack(self.peek(offset + XTFFileHdr.XTFPingChanHeader_NumSamples_offset, 4))[0]
+				offset += XTFFileHdr.XTFPingChanHeader_len + NumSamples * (1 if XTFFileHdr.XTFChanInfo[i].BytesPerSample == 1 else 2)
+				if offset > position + NumBytesThisRecord:
+					return None
+		return NumBytesThisRecord
+
+	def chainedPacketAt(self, position):
+		'''True if a plausible packet at position ends at the next magic number or the end of the file'''
+		NumBytesThisRecord = self.packetLengthAt(position)
+		if NumBytesThisRecord is None:
+			return False
+		end = position + NumBytesThisRecord
+		if end + self.XTFPacketHeader_len > self.fileSize:
+			# the last packet in the file, so there is no next packet to check against
+			return True
+		return self.peek(end, 2) == self.XTFMagicNumber
+
+	def validPacketAt(self, position):
+		'''check the packet at position.  Its length is only blamed if a chained packet starts inside it'''
+		if self.chainedPacketAt(position):
+			return True
+		NumBytesThisRecord = self.packetLengthAt(position)
+		if NumBytesThisRecord is None:
+			return False
+		nextPosition = self.resync(position + self.XTFPacketHeader_len, limit=position + NumBytesThisRecord)
+		return nextPosition >= position + NumBytesThisRecord
+
+	def resync(self, position, limit=None, chunkSize=1048576):
+		'''the offset of the next chained packet at or after position, or limit'''
+		if limit is None:
+			limit = self.fileSize
+		while position < limit - 1:
+			count = min(chunkSize + 1, limit - position)
+			if self.mmap:
+				data = np.frombuffer(self.fileptr, dtype=np.uint8, count=count, offset=position)
+			else:
+				data = np.frombuffer(self.peek(position, count), dtype=np.uint8)
+			# the chunks overlap by a byte so a magic number split across chunks is still found
+			candidates = np.flatnonzero((data[:-1] == self.XTFMagicNumber[0]) & (data[1:] == self.XTFMagicNumber[1]))
+			del data
+			for i in candidates:
+				if self.chainedPacketAt(position + int(i)):
+					return position + int(i)
+			position += chunkSize
+		return limit
+
+	def skipCorrupt(self, position):
+		'''record the corrupt bytes from position and return the offset of the next valid packet'''
+		nextPosition = self.resync(position + 1)
+		if (position, nextPosition) not in self.skippedRanges:
+			self.skippedRanges.append((position, nextPosition))
+			print ("corrupt packet at byte offset %s, skipped %s bytes" % (position, nextPosition - position))
+		return nextPosition
+
+	def packetPosition(self):
+		'''the offset of the next packet, skipping corrupt ones when validating.  None at the end'''
+		position = self.fileptr.tell()
+		if self.validate and not self.validPacketAt(position):
+			position = self.skipCorrupt(position)
+			self.fileptr.seek(position, 0)
+			if position >= self.fileSize:
+				return None
+		return position
+
 	def readPacketheader(self):
-		data = self.fileptr.read(self.XTFPacketHeader_len)
-		s = self.XTFPacketHeader_unpack(data)
+		if self.mmap:
+			s = self.XTFPacketHeader_unpack(self.fileptr, self.fileptr.tell())
+			self.fileptr.seek(self.XTFPacketHeader_len, 1)
+		else:
+			s = self.XTFPacketHeader_unpack(self.readRecord(0, self.XTFPacketHeader_len))
 
 		MagicNumber					= s[0]
 		HeaderType					 = s[1]
@@ -542,25 +1648,49 @@ class XTFReader:
 
 		return HeaderType, SubChannelNumber, NumChansToFollow, NumBytesThisRecord
 
-	def readPacket(self):
-		ping = None
+	def readRecord(self, start, end):
+		'''read bytes start to end of the current packet into the reusable packet buffer'''
+		if end > len(self.packetBuffer):
+			self.packetView.release()
+			self.packetBuffer = bytearray(max(end, 2 * len(self.packetBuffer)))
+			self.packetView = memoryview(self.packetBuffer)
+		if self.fileptr.readinto(self.packetView[start:end]) != end - start:
+			raise EOFError("truncated packet at byte offset %s" % (self.fileptr.tell()))
+		return self.packetBuffer
+
+	def readPacket(self, headerOnly=False):
+		'''read the next packet.  Returns it decoded if its HeaderType is subscribed, otherwise None'''
+		packet = None
 		# remember the start position, so we can easily comput the position of the next packet
-		currentPacketPosition = self.fileptr.tell()
+		currentPacketPosition = self.packetPosition()
+		if currentPacketPosition is None:
+			return None
 
 		# read the packet header.  This permits us to skip packets we do not support
 		HeaderType, SubChannelNumber, NumChansToFollow, NumBytesThisRecord = self.readPacketheader()
-		if HeaderType == 0:
-			ping = XTFPINGHEADER(self.fileptr, self.XTFFileHdr, SubChannelNumber, NumChansToFollow, NumBytesThisRecord)
-			
-			# now read the padbytes at the end of the packet
-			padBytes = currentPacketPosition + NumBytesThisRecord - self.fileptr.tell()
-			if padBytes > 0:
-				data = self.fileptr.read(padBytes)
-		else:
-			# print ("unsupported packet type: %s at byte offset %s" % (HeaderType, currentPacketPosition))
-			self.fileptr.seek(currentPacketPosition + NumBytesThisRecord, 0)
+		if HeaderType in self.subscribedTypes:
+			pingHeaderOnly = headerOnly and HeaderType == 0
+			if self.mmap:
+				# the map is the buffer, so decode straight from the file
+				buffer = self.fileptr
+				offset = currentPacketPosition + self.XTFPacketHeader_len
+			else:
+				# pull the rest of the packet into the packet buffer with one readinto. Header only reads stop after the ping header
+				end = self.XTFPacketHeader_len + self.XTFFileHdr.XTFPingHeader_len if pingHeaderOnly else NumBytesThisRecord
+				buffer = self.readRecord(self.XTFPacketHeader_len, end)
+				offset = self.XTFPacketHeader_len
+			if HeaderType == 0:
+				if pingHeaderOnly:
+					# no channels are decoded, so pingChannel is empty
+					NumChansToFollow = 0
+				packet = XTFPINGHEADER(buffer, offset, self.XTFFileHdr, SubChannelNumber, NumChansToFollow, NumBytesThisRecord, self.selectedChannels)
+			else:
+				packet = XTFPacketDecoders[HeaderType](buffer, offset, self.XTFFileHdr, SubChannelNumber, NumChansToFollow, NumBytesThisRecord)
+		# skip any pad bytes, unread channels or unsubscribed packets with a seek rather than a read
+		# print ("unsupported packet type: %s at byte offset %s" % (HeaderType, currentPacketPosition))
+		self.fileptr.seek(currentPacketPosition + NumBytesThisRecord, 0)
 	
-		return ping
+		return packet
 	
 	# def readChannel(self):		
 	#	 return XTFPINGCHANHEADER()
@@ -10,13 +10,18 @@ version changelog: Reader.iterShapeRecords() bugfix for Python 3
 
 __version__ = "1.2.3"
 
-from struct import pack, unpack, calcsize, error
+from struct import pack, unpack, unpack_from, calcsize, error
 import os
 import sys
 import time
 import array
 import tempfile
 import itertools
+try:
+    import numpy as np
+except ImportError:
+    # numpy is only needed for the array based reading and writing
+    np = None
 
 #
 # Constants for shape types
@@ -88,6 +93,10 @@ def is_string(v):
     else:
         return isinstance(v, basestring)
 
+def _isArray(v):
+    """True for a numpy array of points, which the Writer serialises in blocks"""
+    return np is not None and isinstance(v, np.ndarray)
+
 class _Array(array.array):
     """Converts python tuples to lits of the appropritate type.
     Used to unpack different shapefile header parts."""
@@ -196,6 +205,69 @@ class _ShapeRecord:
         self.shape = shape
         self.record = record
 
+class _Table:
+    """The records of a dbf file as a numpy structured array of raw fixed
+    width byte fields. Indexing by field name returns that field for every
+    record as a numpy array, converted once on first access: N and F fields
+    become int64, or float64 with nan for blanks, D fields datetime64[D]
+    with NaT for blanks, L fields 'T', 'F' or '?' and all other fields
+    stripped strings. deleted is True for the records marked as deleted,
+    which records() leaves out."""
+    def __init__(self, data, fields):
+        self.data = data
+        self.fields = fields
+        self.__index = dict((field[0], i) for i, field in enumerate(fields))
+        self.__columns = {}
+
+    def __len__(self):
+        return len(self.data)
+
+    def keys(self):
+        return [field[0] for field in self.fields]
+
+    @property
+    def deleted(self):
+        return self.data['DeletionFlag'] != b(' ')
+
+    def __getitem__(self, name):
+        if name not in self.__columns:
+            i = self.__index[name]
+            self.__columns[name] = self.__convert(self.fields[i], self.data['f%d' % i])
+        return self.__columns[name]
+
+    def __convert(self, field, raw):
+        """Converts one raw column the way Reader.record() converts a value."""
+        name, typ, size, deci = field
+        if typ in ("N", "F"):
+            # QGIS NULL is all '*' chars
+            values = np.char.strip(np.char.replace(raw, b('*'), b('')))
+            blank = values == b('')
+            if deci or blank.any():
+                return np.where(blank, b('nan'), values).astype(np.float64)
+            try:
+                return values.astype(np.int64)
+            except ValueError:
+                return values.astype(np.float64)
+        elif typ == "D":
+            values = np.char.strip(raw)
+            # QGIS NULL is all '0' chars
+            blank = np.char.count(values, b('0')) == np.char.str_len(values)
+            try:
+                ymd = np.where(blank, b('19700101'), values).astype(np.int64)
+            except ValueError:
+                return values
+            months = (ymd // 10000 - 1970) * 12 + ymd // 100 % 100 - 1
+            dates = months.astype('datetime64[M]').astype('datetime64[D]') + (ymd % 100 - 1)
+            dates[blank] = np.datetime64('NaT')
+            return dates
+        elif typ == "L":
+            first = raw.astype('S1')
+            values = np.full(len(raw), '?', dtype='U1')
+            values[np.isin(first, [b('Y'), b('y'), b('T'), b('t')])] = 'T'
+            values[np.isin(first, [b('N'), b('n'), b('F'), b('f')])] = 'F'
+            return values
+        return np.char.strip(np.char.decode(raw, 'utf-8', 'replace'))
+
 class ShapefileException(Exception):
     """An exception to handle shapefile specific problems."""
     pass
@@ -217,8 +289,15 @@ class Reader:
     within each file is only accessed when required and as
     efficiently as possible. Shapefiles are usually not large
     but they can be.
+
+    With numpy=True the points, parts, z and m values of each shape
+    are numpy arrays rather than lists, decoded with one read per
+    record. This requires numpy.
     """
     def __init__(self, *args, **kwargs):
+        self.numpy = kwargs.get("numpy", False)
+        if self.numpy and np is None:
+            raise ShapefileException("Reader(numpy=True) requires numpy.")
         self.shp = None
         self.shx = None
         self.dbf = None
@@ -268,7 +347,8 @@ class Reader:
             try:
                 self.shx = open("%s.shx" % shapeName, "rb")
             except IOError:
-                raise ShapefileException("Unable to open %s.shx" % shapeName)
+                # The index is rebuilt from the shp file when needed
+                self.shx = None
             try:
                 self.dbf = open("%s.dbf" % shapeName, "rb")
             except IOError:
@@ -323,79 +403,148 @@ class Reader:
         record = _Shape()
         nParts = nPoints = zmin = zmax = mmin = mmax = None
         (recNum, recLength) = unpack(">2i", f.read(8))
-        # Determine the start of the next record
-        next = f.tell() + (2 * recLength)
-        shapeType = unpack("<i", f.read(4))[0]
+        # Read the whole record in one go and decode it from offsets
+        content = f.read(2 * recLength)
+        shapeType = unpack_from("<i", content, 0)[0]
+        pos = 4
         record.shapeType = shapeType
         # For Null shapes create an empty points list for consistency
         if shapeType == 0:
             record.points = []
         # All shape types capable of having a bounding box
         elif shapeType in (3,5,8,13,15,18,23,25,28,31):
-            record.bbox = _Array('d', unpack("<4d", f.read(32)))
+            record.bbox = _Array('d', unpack_from("<4d", content, pos))
+            pos += 32
         # Shape types with parts
         if shapeType in (3,5,13,15,23,25,31):
-            nParts = unpack("<i", f.read(4))[0]
+            nParts = unpack_from("<i", content, pos)[0]
+            pos += 4
         # Shape types with points
         if shapeType in (3,5,8,13,15,23,25,31):
-            nPoints = unpack("<i", f.read(4))[0]
+            nPoints = unpack_from("<i", content, pos)[0]
+            pos += 4
         # Read parts
         if nParts:
-            record.parts = _Array('i', unpack("<%si" % nParts, f.read(nParts * 4)))
+            if self.numpy:
+                record.parts = np.frombuffer(content, "<i4", nParts, pos)
+            else:
+                record.parts = _Array('i', unpack_from("<%si" % nParts, content, pos))
+            pos += nParts * 4
         # Read part types for Multipatch - 31
         if shapeType == 31:
-            record.partTypes = _Array('i', unpack("<%si" % nParts, f.read(nParts * 4)))
+            record.partTypes = _Array('i', unpack_from("<%si" % nParts, content, pos))
+            pos += nParts * 4
         # Read points - produces a list of [x,y] values
         if nPoints:
-            record.points = [_Array('d', unpack("<2d", f.read(16))) for p in range(nPoints)]
+            if self.numpy:
+                record.points = np.frombuffer(content, "<f8", 2 * nPoints, pos).reshape(nPoints, 2)
+            else:
+                xy = unpack_from("<%sd" % (2 * nPoints), content, pos)
+                record.points = [_Array('d', xy[p:p + 2]) for p in range(0, 2 * nPoints, 2)]
+            pos += 16 * nPoints
         # Read z extremes and values
         if shapeType in (13,15,18,31):
-            (zmin, zmax) = unpack("<2d", f.read(16))
-            record.z = _Array('d', unpack("<%sd" % nPoints, f.read(nPoints * 8)))
+            (zmin, zmax) = unpack_from("<2d", content, pos)
+            if self.numpy:
+                record.z = np.frombuffer(content, "<f8", nPoints, pos + 16)
+            else:
+                record.z = _Array('d', unpack_from("<%sd" % nPoints, content, pos + 16))
+            pos += 16 + 8 * nPoints
         # Read m extremes and values if header m values do not equal 0.0
         if shapeType in (13,15,18,23,25,28,31) and not 0.0 in self.measure:
-            (mmin, mmax) = unpack("<2d", f.read(16))
+            (mmin, mmax) = unpack_from("<2d", content, pos)
             # Measure values less than -10e38 are nodata values according to the spec
-            record.m = []
-            for m in _Array('d', unpack("<%sd" % nPoints, f.read(nPoints * 8))):
-                if m > -10e38:
-                    record.m.append(m)
-                else:
-                    record.m.append(None)
+            if self.numpy:
+                m = np.frombuffer(content, "<f8", nPoints, pos + 16)
+                record.m = np.where(m > -10e38, m, np.nan)
+            else:
+                record.m = []
+                for m in _Array('d', unpack_from("<%sd" % nPoints, content, pos + 16)):
+                    if m > -10e38:
+                        record.m.append(m)
+                    else:
+                        record.m.append(None)
+            pos += 16 + 8 * nPoints
         # Read a single point
         if shapeType in (1,11,21):
-            record.points = [_Array('d', unpack("<2d", f.read(16)))]
+            if self.numpy:
+                record.points = np.frombuffer(content, "<f8", 2, pos).reshape(1, 2)
+            else:
+                record.points = [_Array('d', unpack_from("<2d", content, pos))]
+            pos += 16
         # Read a single Z value
         if shapeType == 11:
-            record.z = unpack("<d", f.read(8))
+            record.z = unpack_from("<d", content, pos)
+            pos += 8
         # Read a single M value
         if shapeType in (11,21):
-            record.m = unpack("<d", f.read(8))
-        # Seek to the end of this record as defined by the record header because
+            record.m = unpack_from("<d", content, pos)
+        # The record header gives the start of the next record because
         # the shapefile spec doesn't require the actual content to meet the header
         # definition.  Probably allowed for lazy feature deletion. 
-        f.seek(next)
         return record
 
     def __shapeIndex(self, i=None):
         """Returns the offset in a .shp file for a shape based on information
-        in the .shx index file."""
-        shx = self.shx
-        if not shx:
-            return None
-        if not self._offsets:
-            # File length (16-bit word * 2 = bytes) - header length
-            shx.seek(24)
-            shxRecordLength = (unpack(">i", shx.read(4))[0] * 2) - 100
-            numRecords = shxRecordLength // 8
-            # Jump to the first record.
-            shx.seek(100)
-            for r in range(numRecords):
-                # Offsets are 16-bit words just like the file length
-                self._offsets.append(unpack(">i", shx.read(4))[0] * 2)
-                shx.seek(shx.tell() + 4)
+        in the .shx index file. The whole index is loaded on first use, as a
+        big-endian numpy view of the shx file when numpy is available. If
+        there is no shx file the index is built once from the record headers
+        of the shp file instead."""
+        if not len(self._offsets):
+            if self.shx:
+                self.__shxOffsets()
+            else:
+                self.__shpOffsets()
         if not i == None:
-            return self._offsets[i]
+            # Offsets are 16-bit words just like the file length
+            return 2 * int(self._offsets[i])
+
+    def __shxOffsets(self):
+        """Loads the offsets of the shx file in a single read or map."""
+        shx = self.shx
+        # File length (16-bit word * 2 = bytes) - header length
+        shx.seek(24)
+        shxRecordLength = (unpack(">i", shx.read(4))[0] * 2) - 100
+        numRecords = shxRecordLength // 8
+        if np is not None:
+            name = getattr(shx, "name", None)
+            if is_string(name) and os.path.isfile(name):
+                try:
+                    index = np.memmap(name, dtype=">i4", mode="r", offset=100,
+                                      shape=(numRecords, 2))
+                    self._offsets = index[:, 0]
+                    return
+                except (ValueError, IOError, OSError):
+                    # A short or unmappable file is read instead
+                    pass
+        # Jump to the first record.
+        shx.seek(100)
+        data = shx.read(numRecords * 8)
+        numRecords = len(data) // 8
+        if np is not None:
+            self._offsets = np.frombuffer(data, ">i4", 2 * numRecords)[0::2]
+        else:
+            self._offsets = unpack(">%di" % (2 * numRecords), data[:8 * numRecords])[0::2]
+
+    def __shpOffsets(self):
+        """Builds the offsets from the shp file by reading only the 8 byte
+        header of each record, which gives the length of its content."""
+        shp = self.__getFileObj(self.shp)
+        shp.seek(0, 2)
+        shpLength = shp.tell()
+        offsets = []
+        pos = 100
+        while pos + 8 <= shpLength:
+            shp.seek(pos)
+            recLength = unpack(">2i", shp.read(8))[1]
+            offsets.append(pos // 2)
+            pos += 8 + 2 * recLength
+        self._offsets = offsets
+
+    def shapeOffsets(self):
+        """Returns the byte offset in the shp file of every shape."""
+        self.__shapeIndex()
+        return [2 * int(offset) for offset in self._offsets]
 
     def shape(self, i=0):
         """Returns a shape object for a shape in the the geometry
@@ -403,11 +552,6 @@ class Reader:
         shp = self.__getFileObj(self.shp)
         i = self.__restrictIndex(i)
         offset = self.__shapeIndex(i)
-        if not offset:
-            # Shx index not available so iterate the full list.
-            for j,k in enumerate(self.iterShapes()):
-                if j == i:
-                    return k
         shp.seek(offset)
         return self.__shape()
 
@@ -436,6 +580,60 @@ class Reader:
         while shp.tell() < self.shpLength:
             yield self.__shape()    
 
+    def shapesArray(self):
+        """Reads the x,y values of every shape into one flat numpy array
+        with a single read of the shp file. Returns (points, parts, offsets):
+        points is an (n, 2) float64 array, parts holds the index in points
+        where each part starts and offsets the index in parts of the first
+        part of each shape, with a final entry after the last shape. So the
+        parts of shape i are parts[offsets[i]:offsets[i+1]], and a part
+        runs up to the start of the next one or len(points). Point and
+        multipoint shapes have one part, null shapes none. Requires numpy."""
+        if np is None:
+            raise ShapefileException("Reader.shapesArray() requires numpy.")
+        shp = self.__getFileObj(self.shp)
+        shp.seek(100)
+        data = shp.read()
+        blocks = []
+        parts = []
+        offsets = [0]
+        numPoints = 0
+        pos = 0
+        while pos + 12 <= len(data):
+            recLength = unpack_from(">i", data, pos + 4)[0]
+            content = pos + 8
+            pos = content + 2 * recLength
+            shapeType = unpack_from("<i", data, content)[0]
+            if shapeType in (3,5,13,15,23,25,31):
+                nParts, nPoints = unpack_from("<2i", data, content + 36)
+                start = content + 44 + 4 * nParts
+                if shapeType == 31:
+                    start += 4 * nParts
+                shapeParts = np.frombuffer(data, "<i4", nParts, content + 44) + numPoints
+            elif shapeType in (8,18,28):
+                nPoints = unpack_from("<i", data, content + 36)[0]
+                start = content + 40
+                shapeParts = np.array([numPoints])
+            elif shapeType in (1,11,21):
+                nPoints = 1
+                start = content + 4
+                shapeParts = np.array([numPoints])
+            else:
+                nPoints = 0
+                shapeParts = np.empty(0)
+            if nPoints:
+                blocks.append(np.frombuffer(data, "<f8", 2 * nPoints, start))
+                numPoints += nPoints
+                parts.append(shapeParts)
+            offsets.append(offsets[-1] + (len(shapeParts) if nPoints else 0))
+        if blocks:
+            points = np.concatenate(blocks).reshape(-1, 2)
+            parts = np.concatenate(parts).astype(np.int64)
+        else:
+            points = np.empty((0, 2))
+            parts = np.empty(0, dtype=np.int64)
+        return points, parts, np.array(offsets, dtype=np.int64)
+
     def __dbfHeaderLength(self):
         """Retrieves the header length of a dbf file header."""
         if not self.__dbfHdrLength:
@@ -558,6 +756,37 @@ class Reader:
             if r:
                 yield r
 
+    def recordsArray(self):
+        """Views every record of the dbf file at once as a numpy structured
+        array of fixed width byte fields, memory mapped when the dbf is a
+        file on disk. Nothing is parsed up front: the returned _Table
+        converts a field for all records the first time it is indexed by
+        name. Deleted records are included and flagged in its deleted
+        array. Requires numpy."""
+        if np is None:
+            raise ShapefileException("Reader.recordsArray() requires numpy.")
+        f = self.__getFileObj(self.dbf)
+        if not self.fields:
+            self.__dbfHeader()
+        fields = self.fields[1:]
+        dtype = np.dtype([('DeletionFlag', 'S1')] +
+                         [('f%d' % i, 'S%d' % field[2]) for i, field in enumerate(fields)])
+        offset = self.__dbfHeaderLength()
+        name = getattr(f, "name", None)
+        data = None
+        if is_string(name) and os.path.isfile(name):
+            try:
+                data = np.memmap(name, dtype=dtype, mode='r', offset=offset,
+                                 shape=(self.numRecords,))
+            except (ValueError, IOError, OSError):
+                # A short or unmappable file is read instead
+                data = None
+        if data is None:
+            f.seek(offset)
+            buf = f.read(self.numRecords * dtype.itemsize)
+            data = np.frombuffer(buf, dtype, len(buf) // dtype.itemsize)
+        return _Table(data, fields)
+
     def shapeRecord(self, i=0):
         """Returns a combination geometry and attribute record for the
         supplied record index."""
@@ -579,8 +808,14 @@ class Reader:
 
 
 class Writer:
-    """Provides write support for ESRI Shapefiles."""
-    def __init__(self, shapeType=None):
+    """Provides write support for ESRI Shapefiles.
+    If a target file name is given the writer streams: the .shp, .shx and
+    .dbf files are opened straight away, each shape and record is written
+    as soon as it is added and nothing is kept in memory. The headers are
+    written by close(). With append=True an existing shapefile is opened
+    for update and the new shapes and records are written after the
+    existing ones, which are never read or rewritten."""
+    def __init__(self, shapeType=None, target=None, append=False):
         self._shapes = []
         self.fields = []
         self.records = []
@@ -593,6 +828,71 @@ class Writer:
         self._lengths = []
         # Use deletion flags in dbf? Default is false (0).
         self.deletionFlag = 0
+        # Streaming state. Running counts, extremes and file length
+        # stand in for the lists of shapes and records.
+        self.target = target
+        self.shpNum = 0
+        self.recNum = 0
+        self._bbox = None
+        self._zbox = None
+        self._mbox = None
+        self._shpLength = 100
+        self._dbfHeaderWritten = False
+        if target and append and os.path.isfile(os.path.splitext(target)[0] + '.shp'):
+            self.__openAppend(os.path.splitext(target)[0])
+        elif target:
+            base = os.path.splitext(target)[0]
+            self.shp = self.__getFileObj(base + '.shp')
+            self.shx = self.__getFileObj(base + '.shx')
+            self.dbf = self.__getFileObj(base + '.dbf')
+            # Leave room for the headers, which are written on close
+            self.shp.write(b('\x00' * 100))
+            self.shx.write(b('\x00' * 100))
+
+    def __openAppend(self, base):
+        """Opens an existing shapefile for appending. The counts, extremes
+        and fields are taken from the headers and each file is positioned
+        after its last record."""
+        r = Reader(base)
+        try:
+            if self.shapeType and self.shapeType != r.shapeType:
+                raise ShapefileException("Cannot append shape type %s to a shapefile of type %s." % (self.shapeType, r.shapeType))
+            self.shapeType = r.shapeType
+            self.fields = [tuple(field) for field in r.fields if not field[0].startswith("Deletion")]
+            self._shpLength = r.shpLength
+            offsets = None
+            if r.shx:
+                r.shx.seek(24)
+                self.shpNum = (unpack(">i", r.shx.read(4))[0] * 2 - 100) // 8
+            else:
+                # The missing shx is rebuilt from the shp record headers
+                offsets = r.shapeOffsets()
+                self.shpNum = len(offsets)
+            if self.shpNum > 0:
+                self._bbox = list(r.bbox)
+                self._zbox = list(r.elevation)
+                self._mbox = list(r.measure)
+        finally:
+            for f in (r.shp, r.shx, r.dbf):
+                if f:
+                    f.close()
+        self.shp = open(base + '.shp', 'r+b')
+        self.shp.seek(self._shpLength)
+        if offsets is None:
+            self.shx = open(base + '.shx', 'r+b')
+            self.shx.seek(100 + 8 * self.shpNum)
+        else:
+            self.shx = open(base + '.shx', 'w+b')
+            # Leave room for the header, which is written on close
+            self.shx.write(b('\x00' * 100))
+            ends = offsets[1:] + [self._shpLength]
+            for offset, end in zip(offsets, ends):
+                self.shx.write(pack(">2i", offset // 2, (end - offset - 8) // 2))
+        self.dbf = open(base + '.dbf', 'r+b')
+        self.recNum, headerLength, recordLength = unpack("<4xLHH20x", self.dbf.read(32))
+        # Any end of file marker is overwritten by the next record
+        self.dbf.seek(headerLength + self.recNum * recordLength)
+        self._dbfHeaderWritten = True
 
     def __getFileObj(self, f):
         """Safety handler to verify file-like objects"""
@@ -608,6 +908,8 @@ class Writer:
 
     def __shpFileLength(self):
         """Calculates the file length of the shp file."""
+        if self.target:
+            return self._shpLength // 2
         # Start with header length
         size = 100
         # Calculate size of all shapes
@@ -672,6 +974,14 @@ class Writer:
             shapeType = self.shapeType
             if shapeTypes:
                 shapeType = shapeTypes[shapes.index(s)]
+            if _isArray(s.points):
+                # Array shapes only contribute their extremes
+                if len(s.points):
+                    low = s.points[:, :2].min(axis=0)
+                    high = s.points[:, :2].max(axis=0)
+                    x.extend((low[0], high[0]))
+                    y.extend((low[1], high[1]))
+                continue
             px, py = list(zip(*s.points))[:2]
             x.extend(px)
             y.extend(py)
@@ -680,6 +990,10 @@ class Writer:
     def __zbox(self, shapes, shapeTypes=[]):
         z = []
         for s in shapes:
+            if _isArray(s.points):
+                if len(s.points):
+                    z.extend((s.points[:, 2].min(), s.points[:, 2].max()))
+                continue
             try:
                 for p in s.points:
                     z.append(p[2])
@@ -691,6 +1005,10 @@ class Writer:
     def __mbox(self, shapes, shapeTypes=[]):
         m = [0]
         for s in shapes:
+            if _isArray(s.points):
+                if len(s.points):
+                    m.extend((s.points[:, 3].min(), s.points[:, 3].max()))
+                continue
             try:
                 for p in s.points:
                     m.append(p[3])
@@ -702,16 +1020,32 @@ class Writer:
         """Returns the current bounding box for the shapefile which is
         the lower-left and upper-right corners. It does not contain the
         elevation or measure extremes."""
+        if self.target:
+            return self._bbox or [0, 0, 0, 0]
         return self.__bbox(self._shapes)
 
     def zbox(self):
         """Returns the current z extremes for the shapefile."""
+        if self.target:
+            return self._zbox or [0, 0]
         return self.__zbox(self._shapes)
 
     def mbox(self):
         """Returns the current m extremes for the shapefile."""
+        if self.target:
+            return self._mbox or [0, 0]
         return self.__mbox(self._shapes)
 
+    def __numShapes(self):
+        if self.target:
+            return self.shpNum
+        return len(self._shapes)
+
+    def __numRecords(self):
+        if self.target:
+            return self.recNum
+        return len(self.records)
+
     def __shapefileHeader(self, fileObj, headerType='shp'):
         """Writes the specified header type to the specified file-like object.
         Several of the shapefile formats are so similar that a single generic
@@ -724,7 +1058,7 @@ class Writer:
         if headerType == 'shp':
             f.write(pack(">i", self.__shpFileLength()))
         elif headerType == 'shx':
-            f.write(pack('>i', ((100 + (len(self._shapes) * 8)) // 2)))
+            f.write(pack('>i', ((100 + (self.__numShapes() * 8)) // 2)))
         # Version, Shape type
         f.write(pack("<2i", 1000, self.shapeType))
         # The shapefile's bounding box (lower left, upper right)
@@ -755,7 +1089,7 @@ class Writer:
         for field in self.fields:
             if field[0].startswith("Deletion"):
                 self.fields.remove(field)
-        numRecs = len(self.records)
+        numRecs = self.__numRecords()
         numFields = len(self.fields)
         headerLength = numFields * 32 + 33
         recordLength = sum([int(field[2]) for field in self.fields]) + 1
@@ -781,115 +1115,135 @@ class Writer:
         f.seek(100)
         recNum = 1
         for s in self._shapes:
-            self._offsets.append(f.tell())
-            # Record number, Content length place holder
-            f.write(pack(">2i", recNum, 0))
+            offset, length = self.__shpRecord(f, s, recNum)
+            self._offsets.append(offset)
+            self._lengths.append(length)
             recNum += 1
-            start = f.tell()
-            # Shape Type
-            if self.shapeType != 31:
-                s.shapeType = self.shapeType
-            f.write(pack("<i", s.shapeType))
-            # All shape types capable of having a bounding box
-            if s.shapeType in (3,5,8,13,15,18,23,25,28,31):
-                try:
-                    f.write(pack("<4d", *self.__bbox([s])))
-                except error:
-                    raise ShapefileException("Falied to write bounding box for record %s. Expected floats." % recNum)
-            # Shape types with parts
-            if s.shapeType in (3,5,13,15,23,25,31):
-                # Number of parts
-                f.write(pack("<i", len(s.parts)))
-            # Shape types with multiple points per record
-            if s.shapeType in (3,5,8,13,15,23,25,31):
-                # Number of points
-                f.write(pack("<i", len(s.points)))
-            # Write part indexes
-            if s.shapeType in (3,5,13,15,23,25,31):
+
+    def __shpRecord(self, f, s, recNum):
+        """Writes one shp record at the current position of f. Returns the
+        offset and the content length of the record."""
+        offset = f.tell()
+        # Record number, Content length place holder
+        f.write(pack(">2i", recNum, 0))
+        start = f.tell()
+        # Shape Type
+        if self.shapeType != 31:
+            s.shapeType = self.shapeType
+        f.write(pack("<i", s.shapeType))
+        # All shape types capable of having a bounding box
+        if s.shapeType in (3,5,8,13,15,18,23,25,28,31):
+            try:
+                f.write(pack("<4d", *self.__bbox([s])))
+            except error:
+                raise ShapefileException("Falied to write bounding box for record %s. Expected floats." % recNum)
+        # Shape types with parts
+        if s.shapeType in (3,5,13,15,23,25,31):
+            # Number of parts
+            f.write(pack("<i", len(s.parts)))
+        # Shape types with multiple points per record
+        if s.shapeType in (3,5,8,13,15,23,25,31):
+            # Number of points
+            f.write(pack("<i", len(s.points)))
+        # Array shapes are written a whole block at a time
+        arrayPoints = _isArray(s.points)
+        # Write part indexes
+        if s.shapeType in (3,5,13,15,23,25,31):
+            if arrayPoints:
+                f.write(np.asarray(s.parts, dtype="<i4").tobytes())
+            else:
                 for p in s.parts:
                     f.write(pack("<i", p))
-            # Part types for Multipatch (31)
-            if s.shapeType == 31:
-                for pt in s.partTypes:
-                    f.write(pack("<i", pt))
-            # Write points for multiple-point records
-            if s.shapeType in (3,5,8,13,15,23,25,31):
-                try:
+        # Part types for Multipatch (31)
+        if s.shapeType == 31:
+            for pt in s.partTypes:
+                f.write(pack("<i", pt))
+        # Write points for multiple-point records
+        if s.shapeType in (3,5,8,13,15,23,25,31):
+            try:
+                if arrayPoints:
+                    f.write(np.ascontiguousarray(s.points[:, :2], dtype="<f8").tobytes())
+                else:
                     [f.write(pack("<2d", *p[:2])) for p in s.points]
-                except error:
-                    raise ShapefileException("Failed to write points for record %s. Expected floats." % recNum)
-            # Write z extremes and values
-            if s.shapeType in (13,15,18,31):
+            except error:
+                raise ShapefileException("Failed to write points for record %s. Expected floats." % recNum)
+        # Write z extremes and values
+        if s.shapeType in (13,15,18,31):
+            try:
+                f.write(pack("<2d", *self.__zbox([s])))
+            except error:
+                raise ShapefileException("Failed to write elevation extremes for record %s. Expected floats." % recNum)
+            try:
+                if hasattr(s,"z"):
+                    f.write(pack("<%sd" % len(s.z), *s.z))
+                elif arrayPoints:
+                    f.write(np.ascontiguousarray(s.points[:, 2], dtype="<f8").tobytes())
+                else:
+                    [f.write(pack("<d", p[2])) for p in s.points]  
+            except error:
+                raise ShapefileException("Failed to write elevation values for record %s. Expected floats." % recNum)
+        # Write m extremes and values
+        if s.shapeType in (13,15,18,23,25,28,31):
+            try:
+                if hasattr(s,"m"):
+                    f.write(pack("<%sd" % len(s.m), *s.m))
+                else:
+                    f.write(pack("<2d", *self.__mbox([s])))
+            except error:
+                raise ShapefileException("Failed to write measure extremes for record %s. Expected floats" % recNum)
+            try:
+                if arrayPoints:
+                    f.write(np.ascontiguousarray(s.points[:, 3], dtype="<f8").tobytes())
+                else:
+                    [f.write(pack("<d", p[3])) for p in s.points]
+            except error:
+                raise ShapefileException("Failed to write measure values for record %s. Expected floats" % recNum)
+        # Write a single point
+        if s.shapeType in (1,11,21):
+            try:
+                f.write(pack("<2d", s.points[0][0], s.points[0][1]))
+            except error:
+                raise ShapefileException("Failed to write point for record %s. Expected floats." % recNum)
+        # Write a single Z value
+        if s.shapeType == 11:
+            if hasattr(s, "z"):
                 try:
-                    f.write(pack("<2d", *self.__zbox([s])))
+                    if not s.z:
+                        s.z = (0,)    
+                    f.write(pack("<d", s.z[0]))
                 except error:
-                    raise ShapefileException("Failed to write elevation extremes for record %s. Expected floats." % recNum)
+                    raise ShapefileException("Failed to write elevation value for record %s. Expected floats." % recNum)
+            else:
                 try:
-                    if hasattr(s,"z"):
-                        f.write(pack("<%sd" % len(s.z), *s.z))
-                    else:
-                        [f.write(pack("<d", p[2])) for p in s.points]  
+                    if len(s.points[0])<3:
+                        s.points[0].append(0)
+                    f.write(pack("<d", s.points[0][2]))
                 except error:
-                    raise ShapefileException("Failed to write elevation values for record %s. Expected floats." % recNum)
-            # Write m extremes and values
-            if s.shapeType in (13,15,18,23,25,28,31):
+                    raise ShapefileException("Failed to write elevation value for record %s. Expected floats." % recNum)
+        # Write a single M value
+        if s.shapeType in (11,21):
+            if hasattr(s, "m"):
                 try:
-                    if hasattr(s,"m"):
-                        f.write(pack("<%sd" % len(s.m), *s.m))
-                    else:
-                        f.write(pack("<2d", *self.__mbox([s])))
+                    if not s.m:
+                        s.m = (0,) 
+                    f.write(pack("<1d", s.m[0]))
                 except error:
-                    raise ShapefileException("Failed to write measure extremes for record %s. Expected floats" % recNum)
+                    raise ShapefileException("Failed to write measure value for record %s. Expected floats." % recNum)    
+            else:                                
                 try:
-                    [f.write(pack("<d", p[3])) for p in s.points]
+                    if len(s.points[0])<4:
+                        s.points[0].append(0)
+                    f.write(pack("<1d", s.points[0][3]))
                 except error:
-                    raise ShapefileException("Failed to write measure values for record %s. Expected floats" % recNum)
-            # Write a single point
-            if s.shapeType in (1,11,21):
-                try:
-                    f.write(pack("<2d", s.points[0][0], s.points[0][1]))
-                except error:
-                    raise ShapefileException("Failed to write point for record %s. Expected floats." % recNum)
-            # Write a single Z value
-            if s.shapeType == 11:
-                if hasattr(s, "z"):
-                    try:
-                        if not s.z:
-                            s.z = (0,)    
-                        f.write(pack("<d", s.z[0]))
-                    except error:
-                        raise ShapefileException("Failed to write elevation value for record %s. Expected floats." % recNum)
-                else:
-                    try:
-                        if len(s.points[0])<3:
-                            s.points[0].append(0)
-                        f.write(pack("<d", s.points[0][2]))
-                    except error:
-                        raise ShapefileException("Failed to write elevation value for record %s. Expected floats." % recNum)
-            # Write a single M value
-            if s.shapeType in (11,21):
-                if hasattr(s, "m"):
-                    try:
-                        if not s.m:
-                            s.m = (0,) 
-                        f.write(pack("<1d", s.m[0]))
-                    except error:
-                        raise ShapefileException("Failed to write measure value for record %s. Expected floats." % recNum)    
-                else:                                
-                    try:
-                        if len(s.points[0])<4:
-                            s.points[0].append(0)
-                        f.write(pack("<1d", s.points[0][3]))
-                    except error:
-                        raise ShapefileException("Failed to write measure value for record %s. Expected floats." % recNum)
-            # Finalize record length as 16-bit words
-            finish = f.tell()
-            length = (finish - start) // 2
-            self._lengths.append(length)
-            # start - 4 bytes is the content length field
-            f.seek(start-4)
-            f.write(pack(">i", length))
-            f.seek(finish)
+                    raise ShapefileException("Failed to write measure value for record %s. Expected floats." % recNum)
+        # Finalize record length as 16-bit words
+        finish = f.tell()
+        length = (finish - start) // 2
+        # start - 4 bytes is the content length field
+        f.seek(start-4)
+        f.write(pack(">i", length))
+        f.seek(finish)
+        return offset, length
 
     def __shxRecords(self):
         """Writes the shx records."""
@@ -903,33 +1257,64 @@ class Writer:
         """Writes the dbf records."""
         f = self.__getFileObj(self.dbf)
         for record in self.records:
-            if not self.fields[0][0].startswith("Deletion"):
-                f.write(b(' ')) # deletion flag
-            for (fieldName, fieldType, size, dec), value in zip(self.fields, record):
-                fieldType = fieldType.upper()
-                size = int(size)
-                if fieldType.upper() == "N":
-                    value = str(value).rjust(size)
-                elif fieldType == 'L':
-                    value = str(value)[0].upper()
-                else:
-                    value = str(value)[:size].ljust(size)
-                if len(value) != size:
-                    raise ShapefileException(
-                        "Shapefile Writer unable to pack incorrect sized value"
-                        " (size %d) into field '%s' (size %d)." % (len(value), fieldName, size))
-                value = b(value)
-                f.write(value)
+            self.__dbfRecord(f, record)
+
+    def __dbfRecord(self, f, record):
+        """Writes one dbf record at the current position of f."""
+        if isinstance(record, bytes):
+            # Already formatted by recordsArray()
+            f.write(record)
+            return
+        if not self.fields[0][0].startswith("Deletion"):
+            f.write(b(' ')) # deletion flag
+        for (fieldName, fieldType, size, dec), value in zip(self.fields, record):
+            fieldType = fieldType.upper()
+            size = int(size)
+            if fieldType.upper() == "N":
+                value = str(value).rjust(size)
+            elif fieldType == 'L':
+                value = str(value)[0].upper()
+            else:
+                value = str(value)[:size].ljust(size)
+            if len(value) != size:
+                raise ShapefileException(
+                    "Shapefile Writer unable to pack incorrect sized value"
+                    " (size %d) into field '%s' (size %d)." % (len(value), fieldName, size))
+            value = b(value)
+            f.write(value)
+
+    def __addShape(self, s):
+        """Keeps a new shape for save() or, when streaming, writes it
+        straight to the shp and shx files."""
+        if not self.target:
+            self._shapes.append(s)
+            return
+        if not self.shapeType:
+            self.shapeType = s.shapeType
+        self.shpNum += 1
+        offset, length = self.__shpRecord(self.shp, s, self.shpNum)
+        self.shx.write(pack(">2i", offset // 2, length))
+        self._shpLength = self.shp.tell()
+        if len(s.points):
+            bbox = self.__bbox([s])
+            zbox = self.__zbox([s])
+            mbox = self.__mbox([s])
+            if self._bbox is None:
+                self._bbox, self._zbox, self._mbox = bbox, zbox, mbox
+            else:
+                self._bbox = [min(self._bbox[0], bbox[0]), min(self._bbox[1], bbox[1]), max(self._bbox[2], bbox[2]), max(self._bbox[3], bbox[3])]
+                self._zbox = [min(self._zbox[0], zbox[0]), max(self._zbox[1], zbox[1])]
+                self._mbox = [min(self._mbox[0], mbox[0]), max(self._mbox[1], mbox[1])]
 
     def null(self):
         """Creates a null shape."""
-        self._shapes.append(_Shape(NULL))
+        self.__addShape(_Shape(NULL))
 
     def point(self, x, y, z=0, m=0):
         """Creates a point shape."""
         pointShape = _Shape(self.shapeType)
         pointShape.points.append([x, y, z, m])
-        self._shapes.append(pointShape)
+        self.__addShape(pointShape)
 
     def line(self, parts=[], shapeType=POLYLINE):
         """Creates a line shape. This method is just a convienience method
@@ -942,10 +1327,33 @@ class Writer:
         including lines, polygons, and even multipoint shapes. If no shape type
         is specified it defaults to 'polygon'. If no part types are specified
         (which they normally won't be) then all parts default to the shape type.
+        Parts may be numpy arrays of x, y[, z[, m]] columns, in which case the
+        points are kept as a single (n, 4) array and written in blocks.
         """
         polyShape = _Shape(shapeType)
         polyShape.parts = []
         polyShape.points = []
+        if np is not None and any(_isArray(part) for part in parts):
+            blocks = []
+            count = 0
+            for part in parts:
+                part = np.asarray(part, dtype=np.float64)
+                # Make sure polygons are closed
+                if shapeType in (5,15,25,31) and not np.array_equal(part[0], part[-1]):
+                    part = np.vstack((part, part[:1]))
+                # Make sure points have z and m values
+                block = np.zeros((len(part), 4))
+                block[:, :part.shape[1]] = part[:, :4]
+                blocks.append(block)
+                polyShape.parts.append(count)
+                count += len(part)
+            polyShape.points = np.concatenate(blocks) if blocks else np.zeros((0, 4))
+            if polyShape.shapeType == 31:
+                if not partTypes:
+                    partTypes = [polyShape.shapeType] * len(parts)
+                polyShape.partTypes = partTypes
+            self.__addShape(polyShape)
+            return
         # Make sure polygons are closed
         if shapeType in (5,15,25,31):
             for part in parts:
@@ -966,10 +1374,14 @@ class Writer:
                 for part in parts:
                     partTypes.append(polyShape.shapeType)
             polyShape.partTypes = partTypes
-        self._shapes.append(polyShape)
+        self.__addShape(polyShape)
 
     def field(self, name, fieldType="C", size="50", decimal=0):
-        """Adds a dbf field descriptor to the shapefile."""
+        """Adds a dbf field descriptor to the shapefile. A streaming writer
+        fixes its fields with the first record, and an appending one with
+        the existing file, so no fields can be added after that."""
+        if self.target and self._dbfHeaderWritten:
+            raise ShapefileException("Cannot add field '%s' once the dbf records have started." % name)
         self.fields.append((name, fieldType, size, decimal))
 
     def record(self, *recordList, **recordDict):
@@ -995,7 +1407,83 @@ class Writer:
                     else:
                         record.append(val)
         if record:
-            self.records.append(record)
+            if not self.target:
+                self.records.append(record)
+                return
+            # The field descriptors are fixed by the first record
+            if not self._dbfHeaderWritten:
+                self.__dbfHeader()
+                self._dbfHeaderWritten = True
+            self.recNum += 1
+            self.__dbfRecord(self.dbf, record)
+
+    def recordsArray(self, *columns, **columnDict):
+        """Adds a block of dbf records from columns of values, one column
+        per field given in field order or as keyword arguments of field
+        names and columns. A column is a numpy array or any sequence with
+        one value per record, or a single value shared by every record.
+        The values are formatted as record() formats them, but a whole
+        column at a time into one fixed width buffer, which a streaming
+        writer writes with a single call. Requires numpy."""
+        if np is None:
+            raise ShapefileException("Writer.recordsArray() requires numpy.")
+        fields = [field for field in self.fields if not field[0].startswith("Deletion")]
+        if columnDict:
+            try:
+                columns = [columnDict[field[0]] for field in fields]
+            except KeyError as e:
+                raise ShapefileException("No column given for field %s." % e)
+        if len(columns) != len(fields):
+            raise ShapefileException("Writer.recordsArray() needs one column per field "
+                                     "(%d columns, %d fields)." % (len(columns), len(fields)))
+        columns = [np.asarray(column) for column in columns]
+        numRecords = max([len(column) for column in columns if column.ndim] or [1])
+        dtype = np.dtype([('DeletionFlag', 'S1')] +
+                         [('f%d' % i, 'S%d' % int(field[2])) for i, field in enumerate(fields)])
+        table = np.empty(numRecords, dtype)
+        table['DeletionFlag'] = b(' ')
+        for i, (field, column) in enumerate(zip(fields, columns)):
+            table['f%d' % i] = self.__dbfColumn(field, column, numRecords)
+        if not self.target:
+            self.records.extend(table.view('S%d' % dtype.itemsize).tolist())
+            return
+        if not self._dbfHeaderWritten:
+            self.__dbfHeader()
+            self._dbfHeaderWritten = True
+        self.recNum += numRecords
+        self.dbf.write(table.tobytes())
+
+    def __dbfColumn(self, field, column, numRecords):
+        """Formats a column of values as a fixed width byte array."""
+        fieldName, fieldType, size, dec = field
+        fieldType = fieldType.upper()
+        size = int(size)
+        if column.ndim == 0:
+            column = np.repeat(column, numRecords)
+        elif len(column) != numRecords:
+            raise ShapefileException("Column for field '%s' has %d values, expected %d."
+                                     % (fieldName, len(column), numRecords))
+        if column.dtype.kind == 'M':
+            column = np.char.replace(column.astype('datetime64[D]').astype('U10'), '-', '')
+        elif column.dtype.kind == 'S':
+            column = np.char.decode(column, 'utf-8')
+        text = column.astype('U')
+        if fieldType == "N":
+            text = np.char.rjust(text, size)
+        elif fieldType == 'L':
+            text = np.char.upper(text.astype('U1'))
+        else:
+            text = np.char.ljust(text.astype('U%d' % size), size)
+        try:
+            values = text.astype('S')
+        except UnicodeEncodeError:
+            values = np.char.encode(text, 'utf-8')
+        wrong = np.char.str_len(values) != size
+        if wrong.any():
+            raise ShapefileException(
+                "Shapefile Writer unable to pack incorrect sized value"
+                " (size %d) into field '%s' (size %d)." % (len(values[wrong][0]), fieldName, size))
+        return values
 
     def shape(self, i):
         return self._shapes[i]
@@ -1032,6 +1520,24 @@ class Writer:
         self.__dbfHeader()
         self.__dbfRecords()
 
+    def close(self):
+        """Finishes a streaming write. The shp, shx and dbf headers are
+        written with the final record counts, file lengths and extremes and
+        the files are closed."""
+        if not self.target or self.shp is None:
+            return
+        if not self.shapeType:
+            self.shapeType = NULL
+        # Drop anything beyond the last record, such as a dbf end of file marker
+        for f in (self.shp, self.shx, self.dbf):
+            f.truncate()
+        self.__shapefileHeader(self.shp, headerType='shp')
+        self.__shapefileHeader(self.shx, headerType='shx')
+        self.__dbfHeader()
+        for f in (self.shp, self.shx, self.dbf):
+            f.close()
+        self.shp = self.shx = self.dbf = None
+
     def save(self, target=None, shp=None, shx=None, dbf=None):
         """Save the shapefile data to three files or
         three file-like objects. SHP and DBF files can also
@@ -1039,8 +1545,12 @@ class Writer:
         If target is specified but not shp,shx, or dbf then the target path and
         file name are used.  If no options or specified, a unique base file name
         is generated to save the files and the base file name is returned as a 
-        string. 
+        string. A streaming writer has already written its records, so save()
+        just closes it.
         """
+        if self.target:
+            self.close()
+            return
         # Create a unique file name if one is not defined
         if shp:
             self.saveShp(shp)
@@ -0,0 +1,28 @@
+'''write small synthetic XTF files for the tests'''
+import struct
+
+PINGHEADER = '=h6bh2L2fL21f2d2h4b2f2d4h10fLfL4b2hBL7b'
+CHANHEADER = '=2h5f5hLh2bLhf2bfh4b'
+
+def fileHeader(numChannels=2):
+	header = struct.pack('=bb8s8s16sh64s64s3hbbhbbHf12b10bl12f', 123, 1, b'synth', b'1', b'sonar', 0, b'note', b'file', 3, numChannels, 0, 0, 0, 0, 0, 0, 0, 0.0, *([0] * 12), *([0] * 10), 0, *([0.0] * 12))
+	for i in range(6):
+		header += struct.pack('=bb3hl16s11fhb53s', i, 0, 0, 0, 2, 0, ('CH%d' % i).encode(), 1.0, 100.0 * (1 + i // 2), *([0.0] * 9), 0, 0, b'')
+	return header
+
+def ping(pingNumber, t, x, y, numSamples=(100, 100)):
+	'''a sonar ping at t seconds after midnight, with hundredth of a second resolution'''
+	t = round(t * 100) / 100.0
+	values = [2016, 5, 1, int(t // 3600) % 24, int(t // 60) % 60, int(t) % 60, int(round((t % 1) * 100)), 2, 0, pingNumber] + [0.0] * 2 + [0] + [0.0] * 21 + [0.0, 0.0] + [0, 0] + [0] * 4 + [2.0, 0.0] + [y, x] + [0] * 4 + [0.0] * 10 + [0] + [0.0] + [0] + [0] * 4 + [0, 0] + [0] + [0] + [0] * 7
+	body = struct.pack(PINGHEADER, *values)
+	for channel, samples in enumerate(numSamples):
+		body += struct.pack(CHANHEADER, channel, 0, *([0.0] * 5), *([0] * 5), 0, 0, 0, 0, samples, 0, 0.0, 0, 0, 0.0, 0, 0, 0, 0, 0)
+		body += struct.pack('=%dh' % samples, *[(pingNumber + i) % 100 for i in range(samples)])
+	return struct.pack('=h2b3hL', 0xFACE - 0x10000, 0, 0, len(numSamples), 0, 0, 14 + len(body)) + body
+
+def writeFile(fileName, times, x=1.0, y=50.0):
+	'''write one ping at each of the given times, moving steadily north east from x, y'''
+	with open(fileName, 'wb') as f:
+		f.write(fileHeader())
+		for i, t in enumerate(times):
+			f.write(ping(i + 1, t, x + i * 1e-5, y + i * 1e-5))
@@ -0,0 +1,69 @@
+import os
+from datetime import datetime
+
+import pytest
+
+import xtfcatalog
+from synthetic import writeFile
+
+def pingTimes(start, count):
+	return [start + i for i in range(count)]
+
+@pytest.fixture
+def survey(tmp_path):
+	'''three lines an hour apart, each a degree north east of the last, one of them in a sub folder'''
+	folder = tmp_path / "survey"
+	os.makedirs(str(folder / "sub"))
+	files = {
+		'a': str(folder / "a.xtf"),
+		'b': str(folder / "b.xtf"),
+		'c': str(folder / "sub" / "c.xtf"),
+	}
+	writeFile(files['a'], pingTimes(3600.0, 10), 1.0, 50.0)
+	writeFile(files['b'], pingTimes(7200.0, 10), 2.0, 51.0)
+	writeFile(files['c'], pingTimes(10800.0, 10), 3.0, 52.0)
+	catalog = xtfcatalog.XTFCatalog(str(tmp_path / "catalog.db"))
+	yield str(folder), files, catalog
+	catalog.close()
+
+def test_update(survey):
+	folder, files, catalog = survey
+	assert catalog.update(folder, recursive=True, step=1.0) == (3, 0)
+	assert len(catalog) == 3
+	# nothing has changed, so nothing is read
+	assert catalog.update(folder, recursive=True, step=1.0) == (0, 0)
+	# a changed file is read again
+	writeFile(files['b'], pingTimes(7200.0, 20), 2.0, 51.0)
+	assert catalog.update(folder, recursive=True, step=1.0) == (1, 0)
+	assert catalog.summary(files['b'])['pingCount'] == 20
+	# a removed file is forgotten
+	os.remove(files['c'])
+	assert catalog.update(folder, recursive=True, step=1.0) == (0, 1)
+	assert len(catalog) == 2
+	assert catalog.summary(files['c']) is None
+
+def test_query(survey):
+	folder, files, catalog = survey
+	catalog.update(folder, recursive=True, step=1.0)
+	assert catalog.query() == [files['a'], files['b'], files['c']]
+	assert catalog.query(area=(0.9, 49.9, 1.1, 50.1)) == [files['a']]
+	assert catalog.query(area=(1.5, 50.5, 3.5, 52.5)) == [files['b'], files['c']]
+	assert catalog.query(area=(10.0, 10.0, 11.0, 11.0)) == []
+	assert catalog.query(start=datetime(2016, 5, 1, 2, 0, 5), end=datetime(2016, 5, 1, 2, 30)) == [files['b']]
+	assert catalog.query(start=datetime(2016, 5, 1, 1, 0, 5)) == [files['a'], files['b'], files['c']]
+	assert catalog.query(area=(0.9, 49.9, 1.1, 50.1), start=datetime(2016, 5, 1, 2)) == []
+
+def test_summary(survey):
+	folder, files, catalog = survey
+	catalog.update(folder, recursive=True, step=3.0)
+	summary = catalog.summary(files['a'])
+	assert summary['pingCount'] == 10
+	assert summary['NumberOfSonarChannels'] == 2
+	assert len(summary['channels']) == 2
+	assert datetime.utcfromtimestamp(summary['firstTime']) == datetime(2016, 5, 1, 1, 0, 0)
+	assert datetime.utcfromtimestamp(summary['lastTime']) == datetime(2016, 5, 1, 1, 0, 9)
+	assert summary['minX'] == pytest.approx(1.0)
+	assert summary['maxY'] == pytest.approx(50.0 + 9e-5)
+	# one fix every 3 seconds plus the very last
+	assert summary['trackLine'].shape == (5, 2)
+	assert summary['trackLine'][0].tolist() == pytest.approx([1.0, 50.0])
@@ -0,0 +1,24 @@
+import pytest
+
+import pyXTF
+from synthetic import writeFile
+
+@pytest.fixture
+def reader(tmp_path):
+	'''a two channel file, both channels at 100 kHz, with the unused slots at 200 and 300 kHz'''
+	fileName = str(tmp_path / "channels.xtf")
+	writeFile(fileName, [3600.0 + i for i in range(5)])
+	reader = pyXTF.XTFReader(fileName)
+	yield reader
+	reader.close()
+
+def test_select_in_use_channels(reader):
+	assert reader.selectChannels(frequency=100.0) == [0, 1]
+	assert reader.selectChannels([1]) == [1]
+	ping = reader.readPacket()
+	assert len([channel for channel in ping.pingChannel if channel is not None]) == 1
+
+@pytest.mark.parametrize("selection", [dict(frequency=200.0), dict(channels=[2]), dict(channels=[-1]), dict(channels=["CH3"])])
+def test_reject_unused_channels(reader, selection):
+	with pytest.raises(ValueError):
+		reader.selectChannels(**selection)
@@ -0,0 +1,28 @@
+import numpy as np
+import pytest
+
+import geodetic
+
+def reference(x, k):
+	'''the endpoint extended median filter, one np.median per window'''
+	k2 = (k - 1) // 2
+	padded = np.concatenate(([x[0]] * k2, x, [x[-1]] * k2))
+	return np.array([np.median(padded[i:i + k]) for i in range(len(x))])
+
+@pytest.mark.parametrize("n", [1, 2, 3, 5, 40])
+@pytest.mark.parametrize("k", [1, 3, 7, 11])
+def test_running_median(n, k):
+	rng = np.random.RandomState(n * 100 + k)
+	x = rng.rand(n)
+	np.testing.assert_array_equal(geodetic.runningMedian(x, k), reference(x, k))
+	np.testing.assert_array_equal(geodetic.medfilt(x, k), reference(x, k))
+	# windows straddling the chunks
+	np.testing.assert_array_equal(geodetic.medfilt(x, k, chunkSize=3), reference(x, k))
+
+def test_running_median_nan_stays_local():
+	rng = np.random.RandomState(1)
+	for trial in range(200):
+		x = rng.rand(40)
+		x[rng.randint(40)] = np.nan
+		np.testing.assert_array_equal(geodetic.runningMedian(x, 7), reference(x, 7))
+		np.testing.assert_array_equal(geodetic.medfilt(x, 7, chunkSize=16), reference(x, 7))
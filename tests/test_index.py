@@ -0,0 +1,29 @@
+import os
+
+import pytest
+
+import pyXTF
+from synthetic import writeFile
+
+@pytest.fixture
+def fileName(tmp_path):
+	fileName = str(tmp_path / "index.xtf")
+	writeFile(fileName, [3600.0 + i for i in range(20)])
+	return fileName
+
+@pytest.mark.parametrize("mode", [dict(), dict(mmap=True), dict(prefetch=True)])
+def test_read_ping_headers_keeps_position(fileName, mode):
+	reader = pyXTF.XTFReader(fileName, **mode)
+	for i in range(5):
+		reader.readPacket()
+	headers = reader.readPingHeaders(["PingNumber"])
+	assert headers["PingNumber"].tolist() == list(range(1, 21))
+	assert reader.readPacket().PingNumber == 6
+	reader.close()
+	assert os.path.isfile(pyXTF.XTFINDEX.sidecarFileName(fileName))
+
+def test_read_ping_headers_rejects_no_fields(fileName):
+	reader = pyXTF.XTFReader(fileName)
+	with pytest.raises(ValueError):
+		reader.readPingHeaders([])
+	reader.close()
@@ -0,0 +1,67 @@
+import numpy as np
+import pytest
+
+import pyXTF
+from synthetic import writeFile
+
+def readPing(reader, headerOnly=False):
+	'''the ping number and sample data of the next ping, or None at the end of the file'''
+	if not reader.moreData():
+		return None
+	ping = reader.readPacket(headerOnly)
+	if ping is None:
+		return None
+	if headerOnly:
+		return ping.PingNumber
+	return ping.PingNumber, [np.asarray(channel.data).tolist() for channel in ping.pingChannel]
+
+def walk(reader):
+	'''read the file with rewinds, forward and backward seeks, header only skips and reads past the end'''
+	pings = []
+	while True:
+		ping = readPing(reader)
+		if ping is None:
+			break
+		pings.append(ping)
+	pings.append(readPing(reader))
+	reader.rewind()
+	pings += [readPing(reader) for i in range(3)]
+	# forward, well beyond what is buffered
+	reader.seekPing(30)
+	pings += [readPing(reader) for i in range(2)]
+	# forward, within what is buffered
+	reader.seekPing(33)
+	pings += [readPing(reader, headerOnly=True) for i in range(3)]
+	pings += [readPing(reader)]
+	# backward
+	reader.seekPing(4)
+	pings += [readPing(reader) for i in range(2)]
+	reader.seekPing(39)
+	pings += [readPing(reader) for i in range(3)]
+	return pings
+
+@pytest.mark.parametrize("chunkSize", [100, 1000, 65536])
+def test_prefetch_matches_plain_reads(tmp_path, chunkSize):
+	fileName = str(tmp_path / "prefetch.xtf")
+	writeFile(fileName, [3600.0 + i for i in range(40)])
+	plain = pyXTF.XTFReader(fileName)
+	expected = walk(plain)
+	plain.close()
+	# a ping is about 800 bytes, so a 100 byte chunk never holds a whole packet
+	reader = pyXTF.XTFReader(fileName, prefetch=True, prefetchDepth=2, prefetchChunkSize=chunkSize)
+	assert walk(reader) == expected
+	assert expected[-3:] == [(39, expected[38][1]), (40, expected[39][1]), None]
+	reader.close()
+	assert reader.prefetcher.thread is None
+
+def test_close_stops_read_ahead(tmp_path):
+	fileName = str(tmp_path / "prefetch.xtf")
+	writeFile(fileName, [3600.0 + i for i in range(40)])
+	reader = pyXTF.XTFReader(fileName, prefetch=True, prefetchDepth=2, prefetchChunkSize=100)
+	reader.readPacket()
+	# the queue is full long before the end of the file, so the thread is waiting to hand over a chunk
+	thread = reader.prefetcher.thread
+	assert thread.is_alive()
+	reader.close()
+	assert reader.prefetcher.thread is None
+	assert not thread.is_alive()
@@ -0,0 +1,72 @@
+import os
+
+import pytest
+
+import pyXTF
+import shapefile
+
+def writeLines(fileName, first, count, append=False):
+	if append:
+		w = shapefile.Writer(target=fileName, append=True)
+	else:
+		w = shapefile.Writer(shapefile.POLYLINE, target=fileName)
+		w.field("LineName", "C")
+		w.field("SurveyDate", "D")
+	for i in range(first, first + count):
+		w.line(parts=[[[i, 0.0], [i, 1.0 + i % 3], [i + 0.5, 2.0]]])
+		w.record("line%d.xtf" % i, "20160501")
+	w.close()
+
+def readBytes(fileName):
+	with open(fileName, 'rb') as f:
+		return f.read()
+
+def test_append_rebuilds_missing_shx(tmp_path):
+	expected = str(tmp_path / "expected.shp")
+	writeLines(expected, 0, 5)
+	fileName = str(tmp_path / "track.shp")
+	writeLines(fileName, 0, 3)
+	os.remove(str(tmp_path / "track.shx"))
+	writeLines(fileName, 3, 2, append=True)
+	for ext in ('.shp', '.shx', '.dbf'):
+		assert readBytes(fileName[:-4] + ext) == readBytes(expected[:-4] + ext)
+	r = shapefile.Reader(fileName)
+	assert [s.points[0][0] for s in r.shapes()] == [0, 1, 2, 3, 4]
+	assert r.shape(4).points == r.shapes()[4].points
+
+def test_shape_without_shx(tmp_path):
+	fileName = str(tmp_path / "track.shp")
+	writeLines(fileName, 0, 20)
+	os.remove(str(tmp_path / "track.shx"))
+	r = shapefile.Reader(fileName)
+	shapes = r.shapes()
+	for i in (0, 7, 19, -1):
+		assert r.shape(i).points == shapes[i].points
+
+def test_createSHP_reports_unreadable_file(tmp_path, capsys):
+	fileName = str(tmp_path / "track.shp")
+	writeLines(fileName, 0, 2)
+	os.remove(str(tmp_path / "track.dbf"))
+	with pytest.raises(SystemExit):
+		pyXTF.createSHP(fileName)
+	assert "Problem opening existing shape file" in capsys.readouterr().out
+
+def test_no_fields_after_records_start(tmp_path):
+	fileName = str(tmp_path / "track.shp")
+	w = shapefile.Writer(shapefile.POLYLINE, target=fileName)
+	w.field("LineName", "C")
+	w.line(parts=[[[0.0, 0.0], [1.0, 1.0]]])
+	w.record("line0.xtf")
+	with pytest.raises(shapefile.ShapefileException):
+		w.field("SurveyDate", "D")
+	w.close()
+	assert shapefile.Reader(fileName).records() == [["line0.xtf"]]
+
+def test_no_fields_when_appending(tmp_path):
+	fileName = str(tmp_path / "track.shp")
+	writeLines(fileName, 0, 2)
+	w = shapefile.Writer(target=fileName, append=True)
+	with pytest.raises(shapefile.ShapefileException):
+		w.field("Extra", "N", 5)
+	w.close()
+	assert len(shapefile.Reader(fileName).records()) == 2
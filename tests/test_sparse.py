@@ -0,0 +1,44 @@
+import numpy as np
+import pytest
+
+import pyXTF
+from synthetic import writeFile
+
+START = 3600.0
+
+def varyingRateTimes():
+	'''20 Hz for 60 s, then 1 Hz for 120 s, then 20 Hz for 60 s'''
+	times = [START + i / 20.0 for i in range(1200)]
+	times += [START + 60 + i for i in range(120)]
+	times += [START + 180 + i / 20.0 for i in range(1200)]
+	return times
+
+def decimated(fileName, step):
+	reader = pyXTF.XTFReader(fileName)
+	navigation = reader.loadNavigation()
+	reader.close()
+	return navigation.timestamp[pyXTF.decimateNavigation(navigation, step)]
+
+def sampled(fileName, step, index):
+	reader = pyXTF.XTFReader(fileName)
+	if index:
+		reader.loadIndex(useSidecar=False)
+	navigation = reader.sampleNavigation(step)
+	reader.close()
+	return navigation.timestamp
+
+@pytest.mark.parametrize("index", [False, True])
+@pytest.mark.parametrize("step", [10, 3.5, 60])
+def test_varying_ping_rate(tmp_path, step, index):
+	fileName = str(tmp_path / "varying.xtf")
+	writeFile(fileName, varyingRateTimes())
+	expected = decimated(fileName, step)
+	# nothing in the 1 Hz stretch may be skipped
+	assert np.all(np.diff(expected[:-1]) < step + 1.0)
+	np.testing.assert_array_equal(sampled(fileName, step, index), expected)
+
+@pytest.mark.parametrize("index", [False, True])
+def test_step_equal_to_ping_interval(tmp_path, index):
+	fileName = str(tmp_path / "uniform.xtf")
+	writeFile(fileName, [START + i / 10.0 for i in range(300)])
+	np.testing.assert_array_equal(sampled(fileName, 0.1, index), decimated(fileName, 0.1))
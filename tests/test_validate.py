@@ -0,0 +1,58 @@
+import struct
+
+import pytest
+
+import pyXTF
+from synthetic import fileHeader, ping, writeFile
+
+PINGS = 20
+EXPECTED = [p for p in range(1, PINGS) if p not in (5, 10)]
+
+@pytest.fixture
+def corrupt(tmp_path):
+	'''a file with a bad record length on ping 5, a bad magic number on ping 10 and the last ping cut short.  Returns its name and the byte ranges the reader should skip'''
+	fileName = str(tmp_path / "corrupt.xtf")
+	writeFile(fileName, [3600.0 + i for i in range(PINGS)])
+	headerLength = len(fileHeader())
+	pingLength = len(ping(1, 0.0, 0.0, 0.0))
+	offsets = dict((p, headerLength + (p - 1) * pingLength) for p in range(1, PINGS + 1))
+	with open(fileName, 'r+b') as f:
+		# a length that still fits in the file, but runs over the next packet
+		f.seek(offsets[5] + 10)
+		f.write(struct.pack('=L', pingLength + 100))
+		f.seek(offsets[10])
+		f.write(b'\0\0')
+		f.truncate(offsets[PINGS] + 100)
+	fileSize = offsets[PINGS] + 100
+	skipped = [(offsets[5], offsets[6]), (offsets[10], offsets[11]), (offsets[PINGS], fileSize)]
+	return fileName, skipped
+
+@pytest.mark.parametrize("mode", [dict(), dict(mmap=True), dict(prefetch=True, prefetchChunkSize=1000)])
+def test_read_skips_corrupt_packets(corrupt, mode):
+	fileName, skipped = corrupt
+	reader = pyXTF.XTFReader(fileName, validate=True, **mode)
+	pings = []
+	while reader.moreData():
+		packet = reader.readPacket()
+		if packet is None:
+			break
+		pings.append(packet.PingNumber)
+	assert pings == EXPECTED
+	assert reader.skippedRanges == skipped
+	reader.close()
+
+def test_index_skips_corrupt_packets(corrupt):
+	fileName, skipped = corrupt
+	reader = pyXTF.XTFReader(fileName, validate=True)
+	index = reader.buildIndex()
+	assert index.PingNumber[index.pings].tolist() == EXPECTED
+	assert reader.skippedRanges == skipped
+	reader.close()
+
+def test_navigation_skips_corrupt_packets(corrupt):
+	fileName, skipped = corrupt
+	reader = pyXTF.XTFReader(fileName, validate=True)
+	navigation = reader.loadNavigation()
+	assert navigation.pingNumber.tolist() == EXPECTED
+	assert reader.skippedRanges == skipped
+	reader.close()
@@ -0,0 +1,246 @@
+#name:		  xtfcatalog
+#created:	   October 2026
+#description:   a SQLite catalog of XTF files, so we can find the files covering an area or time window without opening them
+#notes:		 See main at end of script for example how to use this.  Each new or changed file is read in full with pyXTF.XTFReader.loadNavigation() and its trackline decimated with pyXTF.decimateNavigation()
+
+# See readme.md for details
+
+import os
+import sys
+import time
+import json
+import sqlite3
+import fnmatch
+import multiprocessing
+from datetime import datetime
+from argparse import ArgumentParser
+from argparse import RawTextHelpFormatter
+import numpy as np
+import pyXTF
+
+def main():
+
+	parser = ArgumentParser(description='Catalog the XTF files in a folder and query the catalog by area and time.',
+			epilog='Example: \n To catalog a folder recursively use -r -i c:/survey -d c:/survey/catalog.db \n to list the files in an area use -a 1.0,50.0,1.1,50.1 \n to list the files in a time window use -t 2016-05-01T00:00:00,2016-05-02T00:00:00 \n', formatter_class=RawTextHelpFormatter)
+	parser.add_argument('-i', dest='inputFolder', action='store', help='The folder of XTF files to add to the catalog')
+	parser.add_argument('-r', action='store_true', default=False, dest='recursive', help='Search recursively.')
+	parser.add_argument('-d', dest='database', action='store', default='catalog.db', help='The catalog database. [Default: catalog.db]')
+	parser.add_argument('-j', '--jobs', dest='jobs', action='store', type=int, default=1, help='Number of files to summarise in parallel worker processes. [Default: 1]')
+	parser.add_argument('-s', dest='step', action='store', default='30', help='Decimate the stored trackline to one fix every step seconds. [Default: 30]')
+	parser.add_argument('-a', dest='area', action='store', default=None, help='List the files whose navigation overlaps minX,minY,maxX,maxY')
+	parser.add_argument('-t', dest='timeWindow', action='store', default=None, help='List the files recorded in the window start,end, as ISO dates e.g. 2016-05-01T12:00:00')
+
+	if len(sys.argv)==1:
+		parser.print_help()
+		sys.exit(1)
+
+	args = parser.parse_args()
+	catalog = XTFCatalog(args.database)
+	if args.inputFolder is not None:
+		catalog.update(args.inputFolder, args.recursive, args.jobs, float(args.step))
+	if args.area is not None or args.timeWindow is not None:
+		area = None
+		start = None
+		end = None
+		if args.area is not None:
+			area = [float(v) for v in args.area.split(',')]
+		if args.timeWindow is not None:
+			start, end = [datetime.strptime(v, '%Y-%m-%dT%H:%M:%S') for v in args.timeWindow.split(',')]
+		for fileName in catalog.query(area, start, end):
+			print (fileName)
+	catalog.close()
+
+###############################################################################
+def findFiles(folder, recursive):
+	'''return the full path of every .xtf file in folder'''
+	matches = []
+	if recursive:
+		for root, dirnames, filenames in os.walk(folder):
+			for f in fnmatch.filter(filenames, '*.xtf'):
+				matches.append(os.path.abspath(os.path.join(root, f)))
+	else:
+		for f in fnmatch.filter(os.listdir(folder), '*.xtf'):
+			matches.append(os.path.abspath(os.path.join(folder, f)))
+	return matches
+
+def summariseFile(job):
+	'''process pool worker.  Reads the file header and navigation of one XTF file and returns its catalog row as a dictionary, or None if the file cannot be read'''
+	fileName, step = job
+	stat = os.stat(fileName)
+	try:
+		reader = pyXTF.XTFReader(fileName)
+		navigation = reader.loadNavigation()
+		XTFFileHdr = reader.XTFFileHdr
+		reader.close()
+	except (OSError, EOFError, ValueError, pyXTF.struct.error) as e:
+		print ("unable to catalog %s: %s" % (fileName, e))
+		return None
+
+	# the scalar header fields only, not the decoders held in the header
+	header = {k: v for k, v in vars(XTFFileHdr).items() if isinstance(v, (int, float, str)) and not k.startswith('XTF')}
+	channels = [vars(ch) for ch in XTFFileHdr.XTFChanInfo[:XTFFileHdr.NumberOfSonarChannels + XTFFileHdr.NumberOfBathymetryChannels]]
+	summary = {
+		'path': fileName,
+		'fileSize': stat.st_size,
+		'mtime': stat.st_mtime_ns,
+		'SonarName': XTFFileHdr.SonarName,
+		'RecordingProgramName': XTFFileHdr.RecordingProgramName,
+		'NavUnits': XTFFileHdr.NavUnits,
+		'NumberOfSonarChannels': XTFFileHdr.NumberOfSonarChannels,
+		'header': json.dumps(header),
+		'channels': json.dumps(channels),
+		'pingCount': len(navigation),
+		'firstTime': None, 'lastTime': None,
+		'minX': None, 'minY': None, 'maxX': None, 'maxY': None,
+		'trackLine': None,
+	}
+	if len(navigation) > 0:
+		summary['firstTime'] = float(navigation.timestamp.min())
+		summary['lastTime'] = float(navigation.timestamp.max())
+		summary['minX'] = float(navigation.sensorX.min())
+		summary['minY'] = float(navigation.sensorY.min())
+		summary['maxX'] = float(navigation.sensorX.max())
+		summary['maxY'] = float(navigation.sensorY.max())
+		line = pyXTF.decimateNavigation(navigation, step)
+		# x,y pairs as little endian doubles
+		summary['trackLine'] = np.column_stack((navigation.sensorX[line], navigation.sensorY[line])).astype('<f8').tobytes()
+	return summary
+
+def toTimestamp(t):
+	if isinstance(t, datetime):
+		return pyXTF.to_timestamp(t)
+	return t
+
+###############################################################################
+class XTFCatalog:
+	'''a SQLite database holding one summary row per XTF file: the file header, channel list, ping count, time span, navigation bounding box and a decimated trackline.
+	The bounding boxes are held in an R*Tree and the time spans are indexed, so area and time queries do not need to touch the XTF files'''
+	columns = ['path', 'fileSize', 'mtime', 'SonarName', 'RecordingProgramName', 'NavUnits', 'NumberOfSonarChannels', 'header', 'channels',
+		'pingCount', 'firstTime', 'lastTime', 'minX', 'minY', 'maxX', 'maxY', 'trackLine']
+
+	def __init__(self, fileName):
+		self.fileName = fileName
+		self.db = sqlite3.connect(fileName)
+		self.db.row_factory = sqlite3.Row
+		self.db.execute('''CREATE TABLE IF NOT EXISTS files (id INTEGER PRIMARY KEY, path TEXT UNIQUE NOT NULL, fileSize INTEGER, mtime INTEGER,
+			SonarName TEXT, RecordingProgramName TEXT, NavUnits INTEGER, NumberOfSonarChannels INTEGER, header TEXT, channels TEXT,
+			pingCount INTEGER, firstTime REAL, lastTime REAL, minX REAL, minY REAL, maxX REAL, maxY REAL, trackLine BLOB)''')
+		self.db.execute('CREATE INDEX IF NOT EXISTS filesTime ON files (firstTime, lastTime)')
+		try:
+			self.db.execute('CREATE VIRTUAL TABLE IF NOT EXISTS filesExtent USING rtree(id, minX, maxX, minY, maxY)')
+			self.rtree = True
+		except sqlite3.OperationalError:
+			# sqlite built without the R*Tree module, so fall back to an ordinary index
+			self.db.execute('CREATE INDEX IF NOT EXISTS filesExtent ON files (minX, maxX)')
+			self.rtree = False
+		self.db.commit()
+
+	def close(self):
+		self.db.close()
+
+	def __len__(self):
+		return self.db.execute('SELECT COUNT(*) FROM files').fetchone()[0]
+
+	def update(self, folder, recursive=True, jobs=1, step=30.0):
+		'''bring the catalog up to date with the XTF files in folder.  Only files which are new, or whose size or modification time has changed, are read.  Rows for files which have been deleted from the folder are removed.
+		Returns the number of files added or updated and the number removed'''
+		start_time = time.time() # time the process
+		fileNames = findFiles(folder, recursive)
+		known = {row['path']: (row['fileSize'], row['mtime']) for row in self.db.execute('SELECT path, fileSize, mtime FROM files')}
+
+		changed = []
+		for fileName in fileNames:
+			stat = os.stat(fileName)
+			if known.get(fileName) != (stat.st_size, stat.st_mtime_ns):
+				changed.append(fileName)
+
+		# forget files which used to be in this folder but are not any more
+		folder = os.path.join(os.path.abspath(folder), '')
+		present = set(fileNames)
+		removed = [path for path in known if path.startswith(folder) and path not in present and (recursive or os.path.dirname(path) == folder[:-1])]
+		for path in removed:
+			self.remove(path)
+
+		# the workers read the files in parallel, this process is the only one writing to the database
+		work = [(fileName, step) for fileName in changed]
+		pool = None
+		if jobs > 1 and len(work) > 1:
+			pool = multiprocessing.Pool(jobs)
+			summaries = pool.imap_unordered(summariseFile, work)
+		else:
+			summaries = map(summariseFile, work)
+		updated = 0
+		for summary in summaries:
+			if summary is not None:
+				self.store(summary)
+				updated += 1
+		if pool is not None:
+			pool.close()
+			pool.join()
+		self.db.commit()
+		print("Catalog update %d files updated, %d removed, %d unchanged Duration %.3fs" % (updated, len(removed), len(fileNames) - len(changed), time.time() - start_time)) # print the processing time.
+		return updated, len(removed)
+
+	def store(self, summary):
+		'''insert or replace the catalog row for one file'''
+		row = self.db.execute('SELECT id FROM files WHERE path = ?', (summary['path'],)).fetchone()
+		values = [summary[c] for c in self.columns]
+		if row is None:
+			cursor = self.db.execute('INSERT INTO files (%s) VALUES (%s)' % (', '.join(self.columns), ', '.join('?' * len(self.columns))), values)
+			id = cursor.lastrowid
+		else:
+			id = row['id']
+			self.db.execute('UPDATE files SET %s WHERE id = ?' % (', '.join(c + ' = ?' for c in self.columns)), values + [id])
+		if self.rtree:
+			self.db.execute('DELETE FROM filesExtent WHERE id = ?', (id,))
+			if summary['minX'] is not None:
+				self.db.execute('INSERT INTO filesExtent (id, minX, maxX, minY, maxY) VALUES (?, ?, ?, ?, ?)', (id, summary['minX'], summary['maxX'], summary['minY'], summary['maxY']))
+
+	def remove(self, path):
+		row = self.db.execute('SELECT id FROM files WHERE path = ?', (path,)).fetchone()
+		if row is None:
+			return
+		self.db.execute('DELETE FROM files WHERE id = ?', (row['id'],))
+		if self.rtree:
+			self.db.execute('DELETE FROM filesExtent WHERE id = ?', (row['id'],))
+
+	def query(self, area=None, start=None, end=None):
+		'''return the paths of the files whose navigation bounding box overlaps area (minX, minY, maxX, maxY) and whose time span overlaps start to end.  start and end are datetimes or unix timestamps, and any of the criteria can be None'''
+		start_time = time.time() # time the process
+		sql = 'SELECT files.path FROM files'
+		where = []
+		values = []
+		if area is not None:
+			minX, minY, maxX, maxY = area
+			if self.rtree:
+				# the R*Tree narrows the search, its boxes are rounded outwards so the exact test is still made on the files table
+				sql += ' JOIN filesExtent ON filesExtent.id = files.id AND filesExtent.minX <= ? AND filesExtent.maxX >= ? AND filesExtent.minY <= ? AND filesExtent.maxY >= ?'
+				values += [maxX, minX, maxY, minY]
+			where.append('files.minX <= ? AND files.maxX >= ? AND files.minY <= ? AND files.maxY >= ?')
+			values += [maxX, minX, maxY, minY]
+		if start is not None:
+			where.append('files.lastTime >= ?')
+			values.append(toTimestamp(start))
+		if end is not None:
+			where.append('files.firstTime <= ?')
+			values.append(toTimestamp(end))
+		if len(where) > 0:
+			sql += ' WHERE ' + ' AND '.join(where)
+		result = [row['path'] for row in self.db.execute(sql + ' ORDER BY files.firstTime', values)]
+		print("Catalog query %d files Duration %.3fs" % (len(result), time.time() - start_time)) # print the processing time.
+		return result
+
+	def summary(self, path):
+		'''return the catalog row for a file as a dictionary, with the header and channels decoded and the trackline as an n x 2 numpy array.  Returns None if the file is not in the catalog'''
+		row = self.db.execute('SELECT * FROM files WHERE path = ?', (os.path.abspath(path),)).fetchone()
+		if row is None:
+			return None
+		summary = dict(row)
+		summary['header'] = json.loads(summary['header'])
+		summary['channels'] = json.loads(summary['channels'])
+		if summary['trackLine'] is not None:
+			summary['trackLine'] = np.frombuffer(summary['trackLine'], dtype='<f8').reshape(-1, 2)
+		return summary
+
+if __name__ == "__main__":
+	main()